@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Run it with an ASGI server (e.g. ``uvicorn backend.asgi:application``) so
+the streaming chatbot endpoint sends events as they are generated.
 """
 
 import os
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Benchmark the MiniLM embedding backends on this machine
+
+For each backend (see healthapp/embedding_backends.py) reports:
+- load time
+- document throughput (chunks/s at the ingestion batch size)
+- single-query latency (p50/p95)
+- retrieval recall@k against fp32 torch: the share of torch's top-k
+  passages for each query that the backend also ranks in its top-k
+- mixed recall@k: the same, with the backend's query vectors searched
+  against the torch-embedded corpus, which is what a deployment serves
+  after switching backends and before it re-ingests
+- mean cosine similarity of its query vectors to torch's
+
+The corpus is the local vector index's chunks when one exists (see
+CHATBOT_VECTOR_STORE=local), otherwise a small built-in set of passages.
+Embedding caches are bypassed.
+
+Usage: python benchmark_embeddings.py [--backends torch,onnx,...] [--k 5] [--corpus-size 2000]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from healthapp.chatbot_config import ENCODE_BATCH_SIZE, LOCAL_INDEX_DIR
+from healthapp.embedding_backends import BACKENDS, load_embeddings
+
+QUERIES = [
+    "What is diabetes?",
+    "What are the symptoms of high blood pressure?",
+    "How is asthma treated?",
+    "What causes heart disease?",
+    "How can I lose weight safely?",
+    "What are the early signs of a stroke?",
+    "Is psoriasis contagious?",
+    "What foods help with acid reflux?",
+    "How much sleep do adults need?",
+    "What is the difference between type 1 and type 2 diabetes?",
+    "What are common causes of anemia?",
+    "How do I know if I have a migraine?",
+    "What is a normal resting heart rate?",
+    "How is pneumonia diagnosed?",
+    "What helps relieve bloating after meals?",
+    "What are the risks of smoking?",
+]
+
+PASSAGES = [
+    "Diabetes is a chronic disease that affects how your body turns food into energy.",
+    "Type 1 diabetes is an autoimmune condition in which the pancreas makes little or no insulin.",
+    "Type 2 diabetes develops when the body becomes resistant to insulin, often linked to excess weight.",
+    "Hypertension, or high blood pressure, is when your blood pressure is consistently too high.",
+    "High blood pressure often has no symptoms, though severe cases can cause headaches or nosebleeds.",
+    "Asthma is a condition that affects the airways in the lungs, making it difficult to breathe.",
+    "Inhaled corticosteroids and bronchodilators are the mainstays of asthma treatment.",
+    "Heart disease refers to several types of heart conditions that can affect heart function.",
+    "Smoking, high cholesterol, diabetes and inactivity raise the risk of coronary artery disease.",
+    "Obesity is a complex disease involving an excessive amount of body fat.",
+    "Safe weight loss combines a modest calorie deficit with regular physical activity.",
+    "Sudden numbness, facial drooping, confusion or trouble speaking can signal a stroke.",
+    "Psoriasis is an immune-mediated skin disease that causes scaly patches; it is not contagious.",
+    "Acid reflux happens when stomach acid flows back into the esophagus, causing heartburn.",
+    "Fatty, spicy and acidic foods, caffeine and alcohol commonly trigger heartburn.",
+    "Most adults need seven to nine hours of sleep per night.",
+    "Iron deficiency, blood loss and vitamin B12 deficiency are common causes of anemia.",
+    "Anemia can cause fatigue, pale skin, shortness of breath and dizziness.",
+    "A migraine is a throbbing headache, often on one side, with nausea and sensitivity to light.",
+    "A normal resting heart rate for adults ranges from 60 to 100 beats per minute.",
+    "Pneumonia is diagnosed with a physical exam, chest X-ray and sometimes blood tests.",
+    "Pneumonia is an infection that inflames the air sacs in one or both lungs.",
+    "Bloating after meals can be eased by eating slowly and limiting gas-producing foods.",
+    "Lactose intolerance causes bloating, cramps and diarrhea after eating dairy products.",
+    "Smoking damages the lungs and blood vessels and causes many types of cancer.",
+    "Regular exercise lowers blood pressure and improves insulin sensitivity.",
+    "Dehydration can cause headache, dark urine, dizziness and fatigue.",
+    "Vitamin D supports bone health and is made in the skin with sun exposure.",
+    "Gout is a form of arthritis caused by uric acid crystals in the joints.",
+    "Chronic kidney disease is often caused by diabetes and high blood pressure.",
+    "Eczema causes itchy, inflamed skin and often begins in childhood.",
+    "Celiac disease is an immune reaction to gluten that damages the small intestine.",
+]
+
+
+def load_corpus(limit):
+    rows = LOCAL_INDEX_DIR / 'rows.jsonl'
+    if not rows.exists():
+        return PASSAGES
+    corpus = []
+    with open(rows, encoding='utf-8') as handle:
+        for line in handle:
+            corpus.append(json.loads(line)['payload']['page_content'])
+            if len(corpus) >= limit:
+                break
+    return corpus or PASSAGES
+
+
+def unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def top_k(queries, corpus, k):
+    return np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+
+
+def measure(backend, corpus, k):
+    started = time.perf_counter()
+    embeddings = load_embeddings(backend, encode_kwargs={'batch_size': ENCODE_BATCH_SIZE})
+    load_seconds = time.perf_counter() - started
+
+    embeddings.embed_documents(corpus[:ENCODE_BATCH_SIZE])  # warm up kernels
+    started = time.perf_counter()
+    documents = unit(embeddings.embed_documents(corpus))
+    throughput = len(corpus) / (time.perf_counter() - started)
+
+    latencies = []
+    queries = []
+    for question in QUERIES:
+        started = time.perf_counter()
+        queries.append(embeddings.embed_query(question))
+        latencies.append((time.perf_counter() - started) * 1000)
+    queries = unit(queries)
+
+    return {
+        'load_seconds': load_seconds,
+        'throughput': throughput,
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        'documents': documents,
+        'queries': queries,
+        'top_k': top_k(queries, documents, k),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--backends', default=','.join(BACKENDS), help="Comma-separated backends to compare")
+    parser.add_argument('--k', type=int, default=5, help="Neighbours compared for recall")
+    parser.add_argument('--corpus-size', type=int, default=2000, help="Chunks taken from the local index")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus_size)
+    k = min(args.k, len(corpus))
+    print(f"🔤 {len(corpus)} passages, {len(QUERIES)} queries, recall@{k} vs torch")
+
+    backends = ['torch'] + [name for name in args.backends.split(',') if name and name != 'torch']
+    results = {}
+    for backend in backends:
+        print(f"⏱️ {backend}...")
+        try:
+            results[backend] = measure(backend, corpus, k)
+        except Exception as e:
+            print(f"   skipped: {e}")
+    if 'torch' not in results:
+        raise SystemExit("❌ The torch reference backend failed to load")
+
+    reference = results['torch']
+
+    def recall(neighbours):
+        return np.mean([len(set(ours) & set(theirs)) / k for ours, theirs in zip(neighbours, reference['top_k'])])
+
+    print(f"\n{'backend':<12}{'load s':>8}{'chunks/s':>10}{'p50 ms':>8}{'p95 ms':>8}{'recall':>8}{'mixed':>8}{'cosine':>8}")
+    for backend, result in results.items():
+        mixed = recall(top_k(result['queries'], reference['documents'], k))
+        cosine = float(np.mean(np.sum(result['queries'] * reference['queries'], axis=1)))
+        print(
+            f"{backend:<12}{result['load_seconds']:>8.1f}{result['throughput']:>10.0f}"
+            f"{result['p50_ms']:>8.1f}{result['p95_ms']:>8.1f}{recall(result['top_k']):>8.3f}"
+            f"{mixed:>8.3f}{cosine:>8.4f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
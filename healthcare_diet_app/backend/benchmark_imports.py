@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Guard the import cost of Django startup
+
+Runs `python -X importtime` in a fresh interpreter that sets up Django and
+imports the URLconf, views and chatbot API module (what a worker loads
+before its first request), then prints the total import time and the
+slowest modules. Also times `manage.py check`.
+
+Exits with status 1 if any heavy ML/vector dependency is imported on that
+path, or if the total exceeds --budget milliseconds, so it can run in CI.
+
+Usage: python benchmark_imports.py [--budget MS] [--top N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# Must only be imported once a question needs the RAG chain
+HEAVY_MODULES = (
+    'torch', 'transformers', 'sentence_transformers', 'langchain', 'langchain_community',
+    'langchain_core', 'langchain_google_genai', 'langchain_pinecone', 'pinecone', 'google.generativeai',
+)
+
+BOOT = (
+    "import django; django.setup(); "
+    "import django.urls; django.urls.get_resolver().url_patterns; "
+    "import healthapp.views, healthapp.medical_chatbot_api"
+)
+
+
+def run_importtime():
+    """Return [(module, self_us, cumulative_us)] for one interpreter boot"""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"❌ Boot failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def time_check():
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, 'manage.py', 'check'],
+        cwd=BACKEND_DIR, check=True, capture_output=True,
+    )
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--budget', type=float, default=None, help="Fail above this many ms of imports")
+    parser.add_argument('--top', type=int, default=15, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    rows = run_importtime()
+    total_ms = sum(self_us for _, self_us, _ in rows) / 1000
+    print(f"📦 {len(rows)} modules imported in {total_ms:.0f} ms")
+    print(f"\n{'cumulative ms':>14}  module")
+    for name, _, cumulative_us in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}  {name}")
+
+    print(f"\n⏱️ manage.py check: {time_check():.2f} s")
+
+    heavy = sorted({
+        name for name, _, _ in rows
+        if any(name == module or name.startswith(module + '.') for module in HEAVY_MODULES)
+    })
+    failed = False
+    if heavy:
+        print(f"\n❌ Heavy modules imported at startup: {', '.join(heavy[:10])}")
+        failed = True
+    if args.budget is not None and total_ms > args.budget:
+        print(f"\n❌ Import time {total_ms:.0f} ms exceeds the {args.budget:.0f} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\n✅ No heavy ML/vector dependencies on the startup path")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark the FoodLog / SymptomLog indexes against a seeded table
+
+Runs in a throwaway test database: seeds the tables, then prints the query
+plan and best-of-N timing for each list/filter query with the model indexes
+dropped and again with them in place.
+
+Usage: python benchmark_indexes.py [food_log_rows]   (default 1000000)
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from django.db import connection
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from healthapp.models import FoodLog, SymptomLog
+
+BATCH_SIZE = 10000
+REPEATS = 5
+MEALS = ['Breakfast', 'Lunch', 'Dinner', 'Snack']
+FOODS = ['Rice', 'Dal', 'Roti', 'Paneer', 'Apple', 'Oats', 'Egg', 'Chicken curry']
+SYMPTOMS = ['Bloating', 'Headache', 'Nausea', 'Fatigue', 'Heartburn']
+
+
+def seed(rows):
+    """Insert `rows` food logs over ~3 years and one symptom per four logs"""
+    print(f"🌱 Seeding {rows} food logs...")
+    start = date.today() - timedelta(days=3 * 365)
+    for offset in range(0, rows, BATCH_SIZE):
+        FoodLog.objects.bulk_create([
+            FoodLog(
+                food=random.choice(FOODS),
+                quantity=f"{random.randint(1, 3)} serving",
+                meal=random.choice(MEALS),
+                date=start + timedelta(days=random.randrange(3 * 365)),
+            )
+            for _ in range(min(BATCH_SIZE, rows - offset))
+        ])
+
+    bounds = FoodLog.objects.aggregate(low=Min('id'), high=Max('id'))
+    symptom_rows = rows // 4
+    print(f"🌱 Seeding {symptom_rows} symptom logs...")
+    now = timezone.now()
+    for offset in range(0, symptom_rows, BATCH_SIZE):
+        SymptomLog.objects.bulk_create([
+            SymptomLog(
+                food_log_id=random.randint(bounds['low'], bounds['high']),
+                symptom=random.choice(SYMPTOMS),
+                severity=random.randint(1, 10),
+                occurred_at=now - timedelta(minutes=random.randrange(3 * 365 * 24 * 60)),
+            )
+            for _ in range(min(BATCH_SIZE, symptom_rows - offset))
+        ])
+
+
+def queries():
+    """The access paths used by the list views, filters and nested reads"""
+    page = ('-date', '-created_at', '-id')
+    day = FoodLog.objects.order_by('-date').values_list('date', flat=True).first()
+    page_ids = list(FoodLog.objects.order_by(*page).values_list('id', flat=True)[:50])
+    return [
+        ("foodlogs list page", FoodLog.objects.order_by(*page)[:50]),
+        ("foodlogs ?date=", FoodLog.objects.filter(date=day).order_by(*page)[:50]),
+        ("foodlogs date range", FoodLog.objects.filter(
+            date__range=(day - timedelta(days=30), day)).order_by(*page)[:50]),
+        ("symptoms list page", SymptomLog.objects.order_by('-occurred_at', '-id')[:50]),
+        ("symptoms for a page of food logs", SymptomLog.objects.filter(
+            food_log_id__in=page_ids).order_by('food_log', '-occurred_at')),
+    ]
+
+
+def set_indexes(enabled):
+    with connection.schema_editor() as editor:
+        for model in (FoodLog, SymptomLog):
+            for index in model._meta.indexes:
+                if enabled:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def report(label):
+    print(f"\n📋 {label}")
+    print("=" * 60)
+    for name, queryset in queries():
+        best = float('inf')
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            list(queryset.all())
+            best = min(best, time.perf_counter() - started)
+        print(f"\n▶ {name}: {best * 1000:.2f} ms")
+        print(queryset.explain())
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        seed(rows)
+        set_indexes(False)
+        report("Without indexes")
+        set_indexes(True)
+        report("With indexes")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
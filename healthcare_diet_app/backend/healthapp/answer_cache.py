@@ -0,0 +1,132 @@
+"""
+Answer cache for the medical chatbot
+
+Questions are looked up first by their normalized text and then, if an
+embedding function is available, by cosine similarity against the
+embeddings of previously answered questions, so "What is diabetes" and
+"what's diabetes?" share one Gemini call.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = _PUNCTUATION.sub(' ', (question or '').lower())
+    return _SPACES.sub(' ', text).strip()
+
+
+class AnswerCache:
+    """
+    Thread-safe LRU of answers with a TTL and an optional semantic lookup.
+
+    `embed` maps a question to a vector (e.g. HuggingFaceEmbeddings.embed_query);
+    a cached answer is reused when its question's cosine similarity is at
+    least `threshold`. `max_size=0` disables the cache.
+    """
+
+    def __init__(self, embed=None, threshold=0.92, ttl=3600, max_size=512):
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (answer, unit vector or None, expires_at)
+        self._matrix = None
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get(self, question):
+        """Return (answer, vector); answer is None on a miss"""
+        if self.max_size <= 0:
+            return None, None
+        key = normalize_question(question)
+
+        with self._lock:
+            self._expire()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return self._entries[key][0], self._entries[key][1]
+
+        vector = self._embed(question)
+        if vector is None:
+            with self._lock:
+                self.misses += 1
+            return None, None
+
+        with self._lock:
+            matrix, keys = self._similarity_matrix()
+            if matrix is not None:
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold and keys[best] in self._entries:
+                    self._entries.move_to_end(keys[best])
+                    self.semantic_hits += 1
+                    return self._entries[keys[best]][0], vector
+            self.misses += 1
+        return None, vector
+
+    def put(self, question, answer, vector=None):
+        if self.max_size <= 0:
+            return
+        key = normalize_question(question)
+        if vector is None and self.embed is not None:
+            vector = self._embed(question)
+
+        with self._lock:
+            self._entries[key] = (answer, vector, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'exact_hits': self.exact_hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    def _embed(self, question):
+        if self.embed is None:
+            return None
+        vector = np.asarray(self.embed(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [key for key, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _similarity_matrix(self):
+        # Rebuilt lazily after writes/evictions; callers hold the lock
+        if self._matrix is None:
+            self._expire()
+            self._matrix_keys = [key for key, entry in self._entries.items() if entry[1] is not None]
+            vectors = [self._entries[key][1] for key in self._matrix_keys]
+            self._matrix = np.vstack(vectors) if vectors else None
+        return self._matrix, self._matrix_keys
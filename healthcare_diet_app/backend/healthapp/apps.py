@@ -1,6 +1,29 @@
+import logging
+import os
+import sys
+
 from django.apps import AppConfig
 
 
 class HealthappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'healthapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Opt-in: load the chatbot at process start instead of on the first
+        # question. Skipped in runserver's file-watching parent process.
+        if os.environ.get('CHATBOT_WARMUP', '').lower() in ('1', 'true', 'yes'):
+            if 'runserver' in sys.argv and os.environ.get('RUN_MAIN') != 'true':
+                return
+            from . import chatbot_workers
+            if chatbot_workers.enabled():
+                chatbot_workers.warm_up()
+                return
+            try:
+                from .medical_chatbot_api import warm_up
+            except ImportError as e:
+                logging.getLogger(__name__).warning("Chatbot warm-up skipped: %s", e)
+                return
+            warm_up(background=True)
@@ -0,0 +1,119 @@
+import csv
+import re
+from pathlib import Path
+
+from django.conf import settings
+
+from .food_index import get_food_index
+from .models import FoodCalorie
+
+# The calorie table lists a reference portion; a logged serving counts as
+# this many of them (same factor the calories tab has always used).
+SERVING_FACTOR = 5
+
+# Minimum fuzzy-match score for a logged food to borrow an entry's calories
+MATCH_THRESHOLD = 0.5
+
+# A leading count: mixed number ("2 1/2"), fraction ("3/4") or decimal
+# ("1.5", ".5"), optionally followed by a weight or volume unit
+_LEADING_QUANTITY = re.compile(
+    r'\s*(?:(?P<whole>\d+)\s+(?P<num>\d+)\s*/\s*(?P<den>\d+)'
+    r'|(?P<fnum>\d+)\s*/\s*(?P<fden>\d+)'
+    r'|(?P<number>\d+(?:\.\d*)?|\.\d+))'
+    r'\s*(?P<unit>(?:g|gm|gms|grams?|kg|mg|ml|l|litres?|liters?|oz|lbs?)\b)?'
+)
+# Only read when the quantity does not start with a number
+_QUANTITY_WORDS = {
+    'half': 0.5,
+    'quarter': 0.25,
+    'one': 1,
+    'two': 2,
+    'three': 3,
+    'four': 4,
+    'five': 5,
+}
+_WORD = re.compile(r'[a-z]+')
+
+DEFAULT_CSV = Path(__file__).resolve().parents[2] / 'frontend' / 'healthify' / 'public' / 'food_calories.csv'
+
+
+def normalize_food_name(name):
+    """Lowercase and collapse whitespace so lookups hit the unique index"""
+    return re.sub(r'\s+', ' ', name or '').strip().lower()
+
+
+def quantity_multiplier(quantity):
+    """
+    Turn a free-text FoodLog.quantity such as "2 bowls" into a multiplier.
+
+    Weights and volumes ("250ml", "10.5 g") say nothing about how many
+    reference portions were eaten and count as one.
+    """
+    quantity = (quantity or '').lower()
+    match = _LEADING_QUANTITY.match(quantity)
+    if match:
+        if match['unit']:
+            return 1
+        if match['number']:
+            return float(match['number'])
+        numerator, denominator = (match['num'], match['den']) if match['whole'] else (match['fnum'], match['fden'])
+        if not int(denominator):
+            return 1
+        return int(match['whole'] or 0) + int(numerator) / int(denominator)
+    for word in _WORD.findall(quantity):
+        if word in _QUANTITY_WORDS:
+            return _QUANTITY_WORDS[word]
+    return 1
+
+
+def food_calories_csv():
+    """The food,calories CSV the table is loaded from"""
+    return Path(getattr(settings, 'HEALTHAPP_FOOD_CALORIES_CSV', DEFAULT_CSV))
+
+
+def read_food_calories(path):
+    """{normalized name: (name, calories)} from a food,calories CSV; later rows win"""
+    rows = {}
+    with Path(path).open(newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle):
+            name = (row.get('food') or '').strip()
+            try:
+                calories = int(row.get('calories') or '')
+            except ValueError:
+                continue
+            if name:
+                rows[normalize_food_name(name)] = (name, calories)
+    return rows
+
+
+def resolve_calories(foods):
+    """
+    Map each food name to calories per reference portion, or 0 if unknown.
+
+    Exact names are resolved with one indexed IN query; the rest go through
+    the in-memory trigram index (aliases, misspellings, extra words).
+    """
+    names = {food: normalize_food_name(food) for food in foods}
+    exact = dict(
+        FoodCalorie.objects
+        .filter(normalized_name__in=set(names.values()))
+        .values_list('normalized_name', 'calories')
+    )
+
+    resolved = {}
+    for food, name in names.items():
+        if name in exact or not name:
+            resolved[food] = exact.get(name, 0)
+            continue
+        matches = get_food_index().search(name, limit=1, min_score=MATCH_THRESHOLD)
+        resolved[food] = matches[0].calories if matches else 0
+    return resolved
+
+
+def estimate_calories(logs):
+    """Estimated calories for each log, given dicts with food and quantity"""
+    per_portion = resolve_calories({log['food'] for log in logs})
+    return [
+        round(per_portion[log['food']] * SERVING_FACTOR * quantity_multiplier(log['quantity']))
+        for log in logs
+    ]
@@ -0,0 +1,78 @@
+"""
+Shared settings for the medical chatbot pipeline, read from the environment
+like the API keys.
+"""
+
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# The chatbot modules are imported on first use, so .env is read here
+# rather than when the views are loaded.
+load_dotenv()
+
+EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+EMBEDDING_DIMENSION = 384
+
+# How MiniLM runs on CPU: 'torch' (fp32), 'torch-int8' (dynamically quantized
+# Linear layers), 'onnx' or 'onnx-int8' (ONNX Runtime; needs
+# sentence-transformers[onnx]). Backends differ slightly in their vectors, so
+# each non-default one gets its own embedding cache namespace.
+EMBEDDING_BACKEND = os.environ.get('CHATBOT_EMBEDDING_BACKEND', 'torch').lower()
+EMBEDDING_NAMESPACE = (
+    EMBEDDING_MODEL if EMBEDDING_BACKEND == 'torch' else f'{EMBEDDING_MODEL}@{EMBEDDING_BACKEND}'
+)
+
+# Local state (embedding cache, ...) lives here; not committed.
+CACHE_DIR = Path(os.environ.get(
+    'CHATBOT_CACHE_DIR',
+    Path(__file__).resolve().parent.parent / '.chatbot_cache',
+))
+
+# Retrieval backend: 'pinecone' (hosted, needs PINECONE_API_KEY) or 'local'
+# (NumPy index on disk under LOCAL_INDEX_DIR, no network round trip).
+VECTOR_STORE = os.environ.get('CHATBOT_VECTOR_STORE', 'pinecone').lower()
+LOCAL_INDEX_DIR = CACHE_DIR / 'vector_index'
+PINECONE_INDEX = 'healthcare-medicalbot'
+
+# Medical PDFs for the ingest_medical_pdfs command
+DATA_DIR = Path(os.environ.get(
+    'CHATBOT_DATA_DIR',
+    Path(__file__).resolve().parent.parent / 'Data',
+))
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 20
+
+# Ingestion: chunks embedded per batch, sentences per encoder forward pass
+# (small batches keep CPU inference cache-friendly), parallel upserts.
+INGEST_BATCH_SIZE = int(os.environ.get('CHATBOT_INGEST_BATCH_SIZE', '256'))
+ENCODE_BATCH_SIZE = int(os.environ.get('CHATBOT_ENCODE_BATCH_SIZE', '32'))
+UPSERT_WORKERS = int(os.environ.get('CHATBOT_UPSERT_WORKERS', '4'))
+UPSERT_RETRIES = 5
+# Chunks at least this similar to one already ingested are skipped (1 disables)
+DEDUP_THRESHOLD = float(os.environ.get('CHATBOT_DEDUP_THRESHOLD', '0.97'))
+
+# Gemini quota: requests per minute, concurrent calls, retries of 429/5xx,
+# and seconds allowed per call including queueing and retries. The limits
+# are enforced per process: CHATBOT_WORKERS pool processes split them, but
+# separate web server processes (e.g. gunicorn workers) each get all of it.
+GEMINI_RPM = float(os.environ.get('GEMINI_RPM', '60'))
+GEMINI_MAX_INFLIGHT = int(os.environ.get('GEMINI_MAX_INFLIGHT', '8'))
+GEMINI_MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', '4'))
+GEMINI_TIMEOUT = float(os.environ.get('GEMINI_TIMEOUT', '20'))
+
+# chatbot_query runs the RAG chain in this many separate processes (0 keeps
+# it in the web worker); at most CHATBOT_WORKER_QUEUE more requests wait.
+CHATBOT_WORKERS = int(os.environ.get('CHATBOT_WORKERS', '0'))
+CHATBOT_WORKER_QUEUE = int(os.environ.get('CHATBOT_WORKER_QUEUE', '64'))
+
+# Concurrent question embeddings are encoded together: up to this many per
+# forward pass, waiting at most this long for company (1 disables).
+QUERY_BATCH_SIZE = int(os.environ.get('CHATBOT_QUERY_BATCH_SIZE', '32'))
+QUERY_BATCH_WAIT = float(os.environ.get('CHATBOT_QUERY_BATCH_WAIT_MS', '5')) / 1000
+
+# Retrieved passages are cached per question embedding (0 disables); the
+# cache is dropped whenever ingestion rewrites INDEX_VERSION_PATH.
+RETRIEVAL_CACHE_SIZE = int(os.environ.get('CHATBOT_RETRIEVAL_CACHE_SIZE', '1024'))
+INDEX_VERSION_PATH = CACHE_DIR / 'index_version'
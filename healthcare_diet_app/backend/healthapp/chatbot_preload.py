@@ -0,0 +1,11 @@
+"""
+Imported once by the chatbot worker pool's fork server (see chatbot_workers)
+
+Loads the RAG libraries and the MiniLM weights before any worker is
+forked, so every worker shares them copy-on-write instead of loading its
+own. Nothing here opens files, sockets or threads that a fork would break.
+"""
+
+from .medical_chatbot_api import load_embedding_model
+
+load_embedding_model()
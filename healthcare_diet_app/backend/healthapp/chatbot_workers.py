@@ -0,0 +1,194 @@
+"""
+Out-of-process chatbot workers
+
+With CHATBOT_WORKERS > 0, chatbot_query hands questions to a pool of local
+processes instead of running MiniLM and the Gemini chain in the web worker,
+so a burst of chat traffic cannot hold the GIL or the threads that serve
+food and symptom logs. Workers are forked from a fork server that has
+already loaded the model (chatbot_preload); each builds its own chain once,
+in the pool initializer, and keeps it for every later question.
+"""
+
+import multiprocessing
+import threading
+from concurrent import futures
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .chatbot_config import CHATBOT_WORKER_QUEUE, CHATBOT_WORKERS
+
+
+class ChatbotBusy(Exception):
+    """Every worker is busy and the queue is full"""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+# Questions running or queued; a slot is freed when the worker finishes,
+# even if the caller stopped waiting. Timed-out questions that are still
+# queued are cancelled so no worker spends time on them.
+_slots = threading.BoundedSemaphore(CHATBOT_WORKERS + CHATBOT_WORKER_QUEUE)
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def enabled():
+    return CHATBOT_WORKERS > 0
+
+
+def ask(question, timeout=None):
+    """
+    Answer `question` in a worker process.
+
+    Raises ChatbotBusy when the queue is full and TimeoutError when no
+    answer arrives within `timeout` seconds (CHATBOT_TIMEOUT by default).
+    """
+    from .medical_chatbot_api import REQUEST_TIMEOUT
+
+    if not _slots.acquire(blocking=False):
+        raise ChatbotBusy("The medical assistant is busy")
+    try:
+        future = _submit(question)
+    except BaseException:
+        _slots.release()
+        raise
+    _count_pending(1)
+    future.add_done_callback(_finished)
+
+    try:
+        return future.result(timeout=REQUEST_TIMEOUT if timeout is None else timeout)
+    except futures.TimeoutError:
+        future.cancel()
+        # Not the builtin TimeoutError before Python 3.11
+        raise TimeoutError("No answer from the chatbot workers in time") from None
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool next time
+        _reset_pool()
+        raise
+
+
+def _submit(question):
+    try:
+        return _get_pool().submit(_answer, question)
+    except BrokenProcessPool:
+        # A worker died while no caller was waiting on it (a timed-out
+        # question, warm-up); replace the pool and try once more
+        _reset_pool()
+        return _get_pool().submit(_answer, question)
+
+
+def warm_up():
+    """
+    Start every worker now, so they load the chain before the first question.
+
+    The status endpoint shows the pool as warming until every worker has
+    reported, then ready, or failed with the first worker's error.
+    """
+    from .medical_chatbot_api import record_pool_readiness
+
+    if not CHATBOT_WORKERS:
+        return
+    record_pool_readiness('warming')
+    pool = _get_pool()
+    # A worker runs its initializer before its first task, so each answer
+    # describes a chain that is already built
+    warming = [pool.submit(_worker_readiness) for _ in range(CHATBOT_WORKERS)]
+    remaining = [len(warming)]
+    lock = threading.Lock()
+
+    def reported(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        reports = []
+        for future in warming:
+            try:
+                reports.append(future.result())
+            except Exception as e:  # the worker died while loading
+                reports.append({'state': 'failed', 'init_seconds': None, 'error': str(e)})
+        failed = [report for report in reports if report['state'] != 'ready']
+        seconds = max((report['init_seconds'] or 0 for report in reports), default=None)
+        if failed:
+            record_pool_readiness('failed', seconds, failed[0]['error'])
+        else:
+            record_pool_readiness('ready', seconds)
+
+    for future in warming:
+        future.add_done_callback(reported)
+
+
+def stats():
+    with _pending_lock:
+        pending = _pending
+    return {
+        'workers': CHATBOT_WORKERS,
+        'started': _pool is not None,
+        'pending': pending,
+        'queue_size': CHATBOT_WORKER_QUEUE,
+    }
+
+
+def shutdown():
+    _reset_pool()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=CHATBOT_WORKERS,
+                mp_context=_context(),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _context():
+    # Forking the Django process itself would copy its DB connections and
+    # threads; a fork server is a clean parent that only holds the model.
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['healthapp.chatbot_preload'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def _finished(future):
+    _count_pending(-1)
+    _slots.release()
+
+
+def _count_pending(delta):
+    global _pending
+    with _pending_lock:
+        _pending += delta
+
+
+def _init_worker():
+    from .medical_chatbot_api import configure_pool_worker, initialize_chatbot
+    configure_pool_worker(CHATBOT_WORKERS)
+    try:
+        initialize_chatbot()
+    except Exception:
+        # ask_medical_question retries and reports the error per question
+        pass
+
+
+def _worker_readiness():
+    from .medical_chatbot_api import readiness
+    return readiness()
+
+
+def _answer(question):
+    from .medical_chatbot_api import ask_medical_question
+    return ask_medical_question(question)
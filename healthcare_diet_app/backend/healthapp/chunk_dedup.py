@@ -0,0 +1,81 @@
+"""
+Duplicate chunk filter for ingestion
+
+Medical PDFs repeat running headers, footers and boilerplate on every page,
+and the splitter turns each repeat into its own chunk. Exact repeats are
+dropped by a hash of their normalized text before they are embedded; near
+repeats ("Page 12" vs "Page 13") are dropped after embedding when their
+cosine similarity to a chunk already kept reaches `threshold`.
+
+Ingestion deduplicates within each file, so every stored chunk belongs to
+the file whose manifest entry lists it and goes away only with that file.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_chunk(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _SPACES.sub(' ', _PUNCTUATION.sub(' ', (text or '').lower())).strip()
+
+
+class ChunkDeduplicator:
+    """Remembers the chunks kept from one file. `threshold >= 1` disables the near-duplicate check"""
+
+    def __init__(self, threshold=0.97):
+        self.threshold = threshold
+        self.exact = 0
+        self.near = 0
+        self._hashes = set()
+        self._kept = None  # unit vectors, grown by doubling
+        self._count = 0
+
+    def is_exact_duplicate(self, text):
+        key = hashlib.sha1(normalize_chunk(text).encode('utf-8')).digest()
+        if key in self._hashes:
+            self.exact += 1
+            return True
+        self._hashes.add(key)
+        return False
+
+    def keep_mask(self, vectors):
+        """Boolean mask of the vectors to store; the rest are near duplicates"""
+        batch = np.asarray(vectors, dtype=np.float32)
+        if self.threshold >= 1 or not len(batch):
+            return np.ones(len(batch), dtype=bool)
+        norms = np.linalg.norm(batch, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        batch = batch / norms
+
+        keep = np.ones(len(batch), dtype=bool)
+        if self._count:
+            keep &= (batch @ self._kept[:self._count].T).max(axis=1) < self.threshold
+        # Within the batch a row only counts against later rows if it is kept
+        similar = (batch @ batch.T) >= self.threshold
+        for i in range(len(batch)):
+            if keep[i]:
+                keep[i + 1:] &= ~similar[i, i + 1:]
+
+        self._remember(batch[keep])
+        self.near += int((~keep).sum())
+        return keep
+
+    def stats(self):
+        return {'duplicates': self.exact, 'near_duplicates': self.near}
+
+    def _remember(self, rows):
+        if self._kept is None:
+            self._kept = np.empty((max(1024, len(rows)), rows.shape[1]), dtype=np.float32)
+        needed = self._count + len(rows)
+        if needed > len(self._kept):
+            grown = np.empty((max(needed, 2 * len(self._kept)), self._kept.shape[1]), dtype=np.float32)
+            grown[:self._count] = self._kept[:self._count]
+            self._kept = grown
+        self._kept[self._count:needed] = rows
+        self._count = needed
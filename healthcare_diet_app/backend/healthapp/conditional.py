@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+
+def row_etag(instance):
+    """Strong ETag for one row, derived from its primary key and updated_at"""
+    return quote_etag(f'{instance.pk}-{instance.updated_at.timestamp():.6f}')
+
+
+class ConditionalDetailMixin:
+    """
+    Conditional requests for RetrieveUpdateDestroyAPIView subclasses.
+
+    GET honours If-None-Match / If-Modified-Since with a 304. PUT, PATCH and
+    DELETE honour If-Match: the row is locked, and if it changed since the
+    client read it the write is refused with 412 instead of silently
+    overwriting someone else's edit.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = row_etag(instance)
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            not_modified = self._etag_matches(if_none_match, etag)
+        else:
+            since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            not_modified = since is not None and int(instance.updated_at.timestamp()) <= since
+
+        if not_modified:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(self.get_serializer(instance).data)
+        return self._with_validators(response, instance)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            instance = self._get_locked_object()
+            failed = self._precondition_failed(request, instance)
+            if failed is not None:
+                return failed
+
+            partial = kwargs.pop('partial', False)
+            serializer = self.get_serializer(instance, data=request.data, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+        return self._with_validators(Response(serializer.data), serializer.instance)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            instance = self._get_locked_object()
+            failed = self._precondition_failed(request, instance)
+            if failed is not None:
+                return failed
+            self.perform_destroy(instance)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _get_locked_object(self):
+        queryset = self.filter_queryset(self.get_queryset()).select_for_update()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def _precondition_failed(self, request, instance):
+        if_match = request.headers.get('If-Match')
+        if if_match is None or self._etag_matches(if_match, row_etag(instance)):
+            return None
+        response = Response(
+            {'error': 'This entry was changed by someone else. Reload it and try again.'},
+            status=status.HTTP_412_PRECONDITION_FAILED
+        )
+        return self._with_validators(response, instance)
+
+    @staticmethod
+    def _etag_matches(header, etag):
+        candidates = parse_etags(header)
+        return '*' in candidates or etag in candidates
+
+    @staticmethod
+    def _with_validators(response, instance):
+        response['ETag'] = row_etag(instance)
+        response['Last-Modified'] = http_date(instance.updated_at.timestamp())
+        response['Cache-Control'] = 'no-cache'
+        return response
+
@@ -0,0 +1,46 @@
+"""
+CPU backends for the MiniLM embedding model
+
+All return a LangChain HuggingFaceEmbeddings for the same model, so the
+rest of the pipeline (cache, batcher, vector stores) is unchanged:
+
+- torch:      full-precision PyTorch (the original setup)
+- torch-int8: Linear layers dynamically quantized to int8
+- onnx:       ONNX Runtime with the model's exported fp32 graph
+- onnx-int8:  ONNX Runtime with the model's int8-quantized (AVX2) graph
+
+Compare them on your hardware with benchmark_embeddings.py.
+"""
+
+from .chatbot_config import EMBEDDING_BACKEND, EMBEDDING_MODEL
+
+BACKENDS = ('torch', 'torch-int8', 'onnx', 'onnx-int8')
+
+# Pre-quantized export published alongside all-MiniLM-L6-v2; the avx2
+# variant runs on any x86-64 CPU from the last decade.
+ONNX_INT8_FILE = 'onnx/model_quint8_avx2.onnx'
+
+
+def load_embeddings(backend=EMBEDDING_BACKEND, model_name=EMBEDDING_MODEL, encode_kwargs=None):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown CHATBOT_EMBEDDING_BACKEND: {backend} (expected one of {', '.join(BACKENDS)})")
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    model_kwargs = {}
+    if backend == 'onnx':
+        model_kwargs = {'backend': 'onnx'}
+    elif backend == 'onnx-int8':
+        model_kwargs = {'backend': 'onnx', 'model_kwargs': {'file_name': ONNX_INT8_FILE}}
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs=encode_kwargs or {},
+    )
+    if backend == 'torch-int8':
+        import torch
+        embeddings.client = torch.quantization.quantize_dynamic(
+            embeddings.client, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return embeddings
@@ -0,0 +1,133 @@
+"""
+Content-addressed cache for embedding vectors
+
+Wraps a LangChain embeddings object so each distinct text is embedded once:
+an in-memory LRU answers repeated questions, and an SQLite file keeps
+vectors across restarts and re-ingestion runs.
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from .chatbot_config import CACHE_DIR, EMBEDDING_NAMESPACE
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:  # cache stays usable without LangChain (tests, tools)
+    Embeddings = object
+
+_SQLITE_BATCH = 500
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Drop-in replacement for `embeddings` that caches its output.
+
+    Keys are SHA-256 hashes of the namespace (model name), the kind of
+    embedding (query/document) and the text, so switching models never
+    returns stale vectors. `path=None` keeps the cache in memory only.
+    """
+
+    def __init__(self, embeddings, namespace, path=None, memory_size=4096):
+        self.embeddings = embeddings
+        self.namespace = namespace
+        self.memory_size = memory_size
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts), 'document', self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed([text], 'query', lambda missing: [self.embeddings.embed_query(missing[0])])[0]
+
+    async def aembed_documents(self, texts):
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_documents, texts)
+
+    async def aembed_query(self, text):
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_query, text)
+
+    def stats(self):
+        with self._lock:
+            return {'memory_size': len(self._memory), 'hits': self.hits, 'misses': self.misses}
+
+    def _key(self, kind, text):
+        payload = f'{self.namespace}\0{kind}\0{text}'.encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def _embed(self, texts, kind, compute):
+        keys = [self._key(kind, text) for text in texts]
+        found = self._lookup(set(keys))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = compute(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            self._store(computed)
+            found.update(computed)
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return [list(map(float, found[key])) for key in keys]
+
+    def _lookup(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            pending = [key for key in keys if key not in found]
+            if self._db is not None and pending:
+                for start in range(0, len(pending), _SQLITE_BATCH):
+                    batch = pending[start:start + _SQLITE_BATCH]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                        batch,
+                    )
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+                        self._remember(key, found[key])
+        return found
+
+    def _store(self, computed):
+        with self._lock:
+            for key, vector in computed.items():
+                self._remember(key, np.asarray(vector, dtype=np.float32))
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in computed.items()],
+                )
+                self._db.commit()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+
+def cache_embeddings(embeddings, namespace=EMBEDDING_NAMESPACE):
+    """Wrap `embeddings` with the shared on-disk cache under CHATBOT_CACHE_DIR"""
+    return CachedEmbeddings(embeddings, namespace, path=CACHE_DIR / 'embeddings.sqlite3')
@@ -0,0 +1,131 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+
+from django.conf import settings
+
+from .models import FoodCalorie
+
+# Common names that don't share letters with the calorie table entry they
+# mean. Keys are matched after normalization; values are FoodCalorie names.
+ALIASES = {
+    'chapati': 'Roti',
+    'chapatti': 'Roti',
+    'phulka': 'Roti',
+    'daal': 'Dal',
+    'dal tadka': 'Dal',
+    'dal fry': 'Dal',
+    'rice': 'Rice Boiled/Steamed',
+    'chawal': 'Rice Boiled/Steamed',
+    'steamed rice': 'Rice Boiled/Steamed',
+    'dahi': 'Curd',
+    'gulab jamun': 'Jamoon',
+    'chana masala': 'Chole',
+    'chickpea curry': 'Chole',
+    'raita': 'Boondi Raitha',
+    'sambhar': 'Sambar',
+    'pulao': 'Veg Pulao',
+    'karela': 'Kerela',
+    'bitter gourd': 'Kerela',
+    'ladies finger': 'Lady fingers',
+    'sago': 'Sabudana',
+}
+
+# Rebuild the in-process index at most this often, so table reloads made by
+# another process are picked up without a restart.
+INDEX_TTL = getattr(settings, 'HEALTHAPP_FOOD_INDEX_TTL', 300)
+
+FoodMatch = namedtuple('FoodMatch', ['name', 'calories', 'score'])
+
+_WORD = re.compile(r'[a-z0-9%/.]+')
+
+
+def trigrams(text):
+    """pg_trgm-style trigrams: each word padded with two leading blanks and one trailing"""
+    grams = set()
+    for word in _WORD.findall((text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class FoodNameIndex:
+    """
+    Inverted trigram index over food names and their aliases.
+
+    A match scores the average of the Dice similarity and how much of the
+    entry's trigrams appear in the query, so "masala roti" still finds
+    "Roti" while unrelated names sharing one word stay below threshold.
+    """
+
+    def __init__(self, foods):
+        self._entries = []
+        self._sizes = []
+        self._postings = defaultdict(list)
+
+        by_name = {}
+        for name, calories in foods:
+            by_name[name.lower()] = (name, calories)
+            self._add(name, name, calories)
+        for alias, target in ALIASES.items():
+            if target.lower() in by_name:
+                self._add(alias, *by_name[target.lower()])
+
+    def _add(self, key, name, calories):
+        grams = trigrams(key)
+        if not grams:
+            return
+        index = len(self._entries)
+        self._entries.append((name, calories))
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings[gram].append(index)
+
+    def search(self, query, limit=5, min_score=0.0):
+        """Best `limit` distinct foods for `query`, highest score first"""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+
+        best = {}
+        for index, count in shared.items():
+            size = self._sizes[index]
+            dice = 2 * count / (len(query_grams) + size)
+            score = (dice + count / size) / 2
+            name, calories = self._entries[index]
+            if score >= min_score and score > best.get(name, (0,))[0]:
+                best[name] = (score, calories)
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[0]))
+        return [
+            FoodMatch(name, calories, round(score, 3))
+            for name, (score, calories) in ranked[:limit]
+        ]
+
+
+_index = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+def get_food_index():
+    """The process-wide index, built from FoodCalorie on first use"""
+    global _index, _built_at
+    if _index is None or time.monotonic() - _built_at > INDEX_TTL:
+        with _lock:
+            if _index is None or time.monotonic() - _built_at > INDEX_TTL:
+                _index = FoodNameIndex(FoodCalorie.objects.values_list('name', 'calories'))
+                _built_at = time.monotonic()
+    return _index
+
+
+def reset_food_index():
+    """Drop the cached index; the next lookup rebuilds it"""
+    global _index
+    with _lock:
+        _index = None
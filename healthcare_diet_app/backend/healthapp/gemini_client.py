@@ -0,0 +1,309 @@
+"""
+Rate-limited wrapper around the Gemini chat model
+
+Every chain in the process shares one GeminiClient, so bursts queue up in
+front of the quota instead of turning into 429s: a token bucket spaces
+calls at GEMINI_RPM, at most GEMINI_MAX_INFLIGHT calls run at once, and
+429/5xx responses are retried with jittered exponential backoff. Each call
+(waits and retries included) must finish within GEMINI_TIMEOUT seconds,
+otherwise asyncio.TimeoutError is raised.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+from .chatbot_config import GEMINI_MAX_INFLIGHT, GEMINI_MAX_RETRIES, GEMINI_RPM, GEMINI_TIMEOUT
+
+try:
+    from langchain_core.runnables import Runnable
+except ImportError:  # limiter pieces stay usable without LangChain (tests, tools)
+    Runnable = object
+
+_BACKOFF_BASE = 0.5
+_BACKOFF_CAP = 8.0
+_END = object()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token and return 0, or return the seconds until one is due"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class _Slots:
+    """
+    Counting semaphore shared by threads and coroutines on any event loop.
+
+    A released slot goes to the longest-waiting coroutine first, woken on
+    its own loop, otherwise to a waiting thread.
+    """
+
+    def __init__(self, value):
+        self._value = value
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._waiters = deque()  # [loop, future, granted] per waiting coroutine
+
+    def acquire(self, timeout):
+        with self._available:
+            if not self._available.wait_for(lambda: self._value > 0, timeout):
+                return False
+            self._value -= 1
+            return True
+
+    async def aacquire(self, timeout):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return True
+            waiter = [loop, loop.create_future(), False]
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), timeout)
+            return True
+        except BaseException as e:
+            with self._lock:
+                granted = waiter[2]
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                self.release()  # handed over just as we gave up
+            if isinstance(e, asyncio.TimeoutError):
+                return False
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._value += 1
+                self._available.notify()
+                return
+            waiter = self._waiters.popleft()
+            waiter[2] = True
+        loop, future = waiter[0], waiter[1]
+        try:
+            loop.call_soon_threadsafe(_resolve, future)
+        except RuntimeError:  # the waiter's loop has closed
+            self.release()
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+def is_retryable(error):
+    """True for rate limiting (429) and server errors (5xx), however wrapped"""
+    while error is not None:
+        code = getattr(error, 'code', None)
+        if code is None:
+            code = getattr(error, 'status_code', None)
+        try:
+            code = int(code)
+        except (TypeError, ValueError):
+            code = None
+        if code == 429 or (code is not None and 500 <= code <= 599):
+            return True
+        error = error.__cause__
+    return False
+
+
+class GeminiClient(Runnable):
+    """
+    Drop-in replacement for the chat model in a LangChain chain.
+
+    invoke/ainvoke/stream/astream go through the limiter; a stream is only
+    retried if it failed before producing its first chunk.
+    """
+
+    def __init__(self, llm, requests_per_minute=GEMINI_RPM, max_inflight=GEMINI_MAX_INFLIGHT,
+                 max_retries=GEMINI_MAX_RETRIES, timeout=GEMINI_TIMEOUT):
+        self.llm = llm
+        self.requests_per_minute = requests_per_minute
+        self.max_inflight = max_inflight
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.bucket = TokenBucket(requests_per_minute / 60, capacity=max(1, min(max_inflight, requests_per_minute)))
+        self._slots = _Slots(max_inflight)
+        # Sync calls run here so the caller can stop waiting at the deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix='gemini')
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+
+    def invoke(self, input, config=None, **kwargs):
+        deadline = time.monotonic() + self.timeout
+        for attempt in itertools.count():
+            self._acquire(deadline)
+            call = self._submit(self.llm.invoke, input, config, **kwargs)
+            try:
+                return call.result(timeout=max(0.0, deadline - time.monotonic()))
+            except futures.TimeoutError:
+                self._count('timeouts')
+                raise asyncio.TimeoutError("Gemini did not answer in time") from None
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+            time.sleep(delay)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        deadline = time.monotonic() + self.timeout
+        for attempt in itertools.count():
+            await self._aacquire(deadline)
+            try:
+                return await self._within(self.llm.ainvoke(input, config, **kwargs), deadline)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+            finally:
+                self._slots.release()
+            await asyncio.sleep(delay)
+
+    def stream(self, input, config=None, **kwargs):
+        deadline = time.monotonic() + self.timeout
+        for attempt in itertools.count():
+            self._acquire(deadline)
+            chunks = queue.Queue()
+            self._submit(self._pump, chunks, input, config, kwargs)
+            started = False
+            try:
+                while True:
+                    try:
+                        chunk, error = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        self._count('timeouts')
+                        raise asyncio.TimeoutError("Gemini did not answer in time") from None
+                    if error is not None:
+                        raise error
+                    if chunk is _END:
+                        return
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started:
+                    raise
+                delay = self._retry_delay(e, attempt, deadline)
+            time.sleep(delay)
+
+    async def astream(self, input, config=None, **kwargs):
+        deadline = time.monotonic() + self.timeout
+        for attempt in itertools.count():
+            await self._aacquire(deadline)
+            started = False
+            try:
+                chunks = self.llm.astream(input, config, **kwargs).__aiter__()
+                while True:
+                    try:
+                        chunk = await self._within(chunks.__anext__(), deadline)
+                    except StopAsyncIteration:
+                        return
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started:
+                    raise
+                delay = self._retry_delay(e, attempt, deadline)
+            finally:
+                self._slots.release()
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests_per_minute': self.requests_per_minute,
+                'max_inflight': self.max_inflight,
+                'calls': self.calls,
+                'retries': self.retries,
+                'timeouts': self.timeouts,
+            }
+
+    def _submit(self, func, *args, **kwargs):
+        # The slot is freed when the call itself returns, not when the
+        # caller stops waiting, so abandoned calls still count against it.
+        call = self._executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+        call.add_done_callback(lambda _: self._slots.release())
+        return call
+
+    def _pump(self, chunks, input, config, kwargs):
+        try:
+            for chunk in self.llm.stream(input, config, **kwargs):
+                chunks.put((chunk, None))
+        except Exception as e:
+            chunks.put((_END, e))
+        else:
+            chunks.put((_END, None))
+
+    def _acquire(self, deadline):
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self._timed_out()
+        wait = self._token_wait(deadline)
+        while wait:
+            time.sleep(wait)
+            wait = self._token_wait(deadline)
+
+    async def _aacquire(self, deadline):
+        if not await self._slots.aacquire(max(0.0, deadline - time.monotonic())):
+            self._timed_out()
+        wait = self._token_wait(deadline)
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._token_wait(deadline)
+
+    def _token_wait(self, deadline):
+        """0 once a token is taken, else seconds to wait; gives the slot back past the deadline"""
+        wait = self.bucket.try_acquire()
+        if not wait:
+            self._count('calls')
+        elif time.monotonic() + wait > deadline:
+            self._slots.release()
+            self._timed_out()
+        return wait
+
+    async def _within(self, awaitable, deadline):
+        try:
+            return await asyncio.wait_for(awaitable, max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self._count('timeouts')
+            raise
+
+    def _retry_delay(self, error, attempt, deadline):
+        """Backoff before the next attempt; re-raises when retrying is pointless"""
+        if isinstance(error, asyncio.TimeoutError) or not is_retryable(error) or attempt >= self.max_retries:
+            raise error
+        delay = random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt))
+        if time.monotonic() + delay > deadline:
+            raise error
+        self._count('retries')
+        return delay
+
+    def _timed_out(self):
+        self._count('timeouts')
+        raise asyncio.TimeoutError("Timed out waiting for Gemini capacity")
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
@@ -0,0 +1,387 @@
+"""
+Incremental PDF ingestion for the medical chatbot
+
+PDFs are parsed and split in a process pool, and each file's SHA-256 is
+recorded in a manifest with its chunk count and the embedding namespace
+(model and backend) its vectors came from. A re-run only re-chunks, embeds
+and upserts files whose content or embedding namespace changed; chunks of
+changed or deleted files are removed from the vector store.
+
+Chunks stream through fixed-size batches: each batch is embedded, then
+upserted on a thread pool with retries while the next one is embedded,
+so memory stays bounded by the batches in flight. Every CHECKPOINT_SECONDS
+the store is persisted (a no-op for Pinecone) and the manifest records how
+many leading chunks of each file are stored; an interrupted run resumes
+from there. Chunks repeated within a file (page headers, footers,
+boilerplate) are dropped before upsert, see chunk_dedup; a resumed file
+replays its stored chunks through the filter first.
+"""
+
+import hashlib
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import (
+    ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from pathlib import Path
+
+import numpy as np
+
+from .chatbot_config import (
+    CACHE_DIR, CHUNK_OVERLAP, CHUNK_SIZE, DEDUP_THRESHOLD, EMBEDDING_DIMENSION, EMBEDDING_NAMESPACE,
+    INGEST_BATCH_SIZE, LOCAL_INDEX_DIR, PINECONE_INDEX, UPSERT_RETRIES, UPSERT_WORKERS, VECTOR_STORE,
+)
+from .chunk_dedup import ChunkDeduplicator
+from .retrieval_cache import bump_index_version
+
+MANIFEST_PATH = CACHE_DIR / 'ingest_manifest.json'
+MANIFEST_VERSION = 2
+CHECKPOINT_SECONDS = 30
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_and_split(path):
+    """Parse one PDF and split it into chunks; runs in a worker process"""
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    # lazy_load() yields one page at a time, so a large PDF is never held whole
+    return [
+        (chunk.page_content, chunk.metadata)
+        for page in PyPDFLoader(str(path)).lazy_load()
+        for chunk in splitter.split_documents([page])
+    ]
+
+
+class Manifest:
+    """
+    {relative path: {'sha256': ..., 'embedding': namespace, 'chunks': n,
+    'upserted': k}} persisted as versioned JSON.
+
+    Entries of an older, unversioned manifest load as stale: they keep the
+    ids their chunks were stored under, so the next run deletes those and
+    re-ingests the file.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = Path(path)
+        self.files = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if 'version' not in data:
+                self.files = {name: _legacy_entry(entry) for name, entry in data.items()}
+            elif data['version'] == MANIFEST_VERSION:
+                self.files = data['files']
+            else:
+                raise ValueError(f"Unsupported ingest manifest version {data['version']} in {self.path}")
+
+    def save(self):
+        # Written at every checkpoint, atomically, so an interrupted run resumes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.path.with_suffix('.tmp')
+        partial.write_text(json.dumps({'version': MANIFEST_VERSION, 'files': self.files}, indent=1), encoding='utf-8')
+        os.replace(partial, self.path)
+
+
+def _legacy_entry(entry):
+    # First format: explicit 'chunk_ids'. Second: 'chunks'/'upserted' with
+    # ids derived from the content hash alone.
+    ids = entry.get('chunk_ids')
+    if ids is None:
+        ids = [f"{entry['sha256'][:16]}-{index}" for index in range(entry.get('chunks', 0))]
+    return {'sha256': None, 'chunks': len(ids), 'upserted': len(ids), 'ids': ids}
+
+
+def chunk_id(name, digest, index):
+    # Ids derive from the path and content hash: re-ingesting is idempotent,
+    # and identical PDFs at two paths keep separate chunks
+    path_hash = hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]
+    return f'{path_hash}-{digest[:16]}-{index}'
+
+
+def ingest(data_dir, store, manifest, workers=None, load=load_and_split, force=False,
+           batch_size=INGEST_BATCH_SIZE, upsert_workers=UPSERT_WORKERS, dedup_threshold=DEDUP_THRESHOLD,
+           embedding=EMBEDDING_NAMESPACE):
+    """
+    Bring `store` in line with the PDFs under `data_dir`.
+
+    Returns counts of added/changed/resumed/unchanged/removed files, new
+    chunks, and chunks skipped as exact or near duplicates. `workers=1`
+    parses in this process (useful for debugging). Files embedded under
+    another `embedding` namespace count as changed.
+    """
+    data_dir = Path(data_dir)
+    paths = {path.relative_to(data_dir).as_posix(): path for path in sorted(data_dir.rglob('*.pdf'))}
+    report = {'added': 0, 'changed': 0, 'resumed': 0, 'unchanged': 0, 'removed': 0, 'chunks': 0}
+
+    stale = [(name, manifest.files.pop(name)) for name in list(manifest.files) if name not in paths]
+    report['removed'] = len(stale)
+
+    pending, changed = {}, set()
+    for name, path in paths.items():
+        digest = file_digest(path)
+        entry = manifest.files.get(name)
+        current = entry is not None and entry['sha256'] == digest and entry.get('embedding') == embedding
+        if current and entry['upserted'] == entry['chunks'] and not force:
+            report['unchanged'] += 1
+            continue
+        pending[name] = (path, digest)
+        if entry is not None and (not current or force):
+            stale.append((name, manifest.files.pop(name)))
+            changed.add(name)
+
+    # Old chunks go first, in one persisted step, before the manifest
+    # forgets them
+    if stale:
+        for name, entry in stale:
+            _delete(store, name, entry)
+        _persist(store)
+        manifest.save()
+
+    writer = _BatchWriter(store, manifest, batch_size, upsert_workers, dedup_threshold)
+    try:
+        for name, chunks in _parse(pending, workers, load):
+            path, digest = pending[name]
+            entry = manifest.files.get(name)
+            start = 0
+            if entry is not None:
+                start = entry['upserted']
+                report['resumed'] += 1
+            elif name in changed:
+                report['changed'] += 1
+            else:
+                report['added'] += 1
+
+            manifest.files[name] = {'sha256': digest, 'embedding': embedding, 'chunks': len(chunks), 'upserted': start}
+            manifest.save()
+            for index, (text, metadata) in enumerate(chunks):
+                writer.add(name, index, chunk_id(name, digest, index), text, dict(metadata, source=name),
+                           replay=index < start)
+            writer.finish(name)
+            report['chunks'] += len(chunks) - start
+        writer.close()
+    finally:
+        writer.shutdown()
+        if report['removed'] or report['changed'] or report['chunks']:
+            bump_index_version()
+    report.update(writer.duplicates)
+    return report
+
+
+class _BatchWriter:
+    """Embeds chunks in batches and upserts them in parallel, checkpointing the manifest"""
+
+    def __init__(self, store, manifest, batch_size, workers, dedup_threshold):
+        self.store = store
+        self.dedup_threshold = dedup_threshold
+        self.dedup = {}  # file name -> ChunkDeduplicator, until the file's rows are flushed
+        self.finished = set()
+        self.duplicates = {'duplicates': 0, 'near_duplicates': 0}
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.max_inflight = 2 * workers
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.inflight = {}  # future -> [(file name, chunk index)]
+        self.stored = defaultdict(set)  # file name -> stored chunk indexes past its checkpoint
+        self.batch = []
+        self.checkpointed = time.monotonic()
+
+    def add(self, name, index, row_id, text, metadata, replay=False):
+        """Queue a chunk; `replay` chunks are already stored and only prime the filter"""
+        if name not in self.dedup:
+            self.dedup[name] = ChunkDeduplicator(self.dedup_threshold)
+        if self.dedup[name].is_exact_duplicate(text):
+            if not replay:
+                self.duplicates['duplicates'] += 1
+                self.stored[name].add(index)
+            return
+        if replay and self.dedup_threshold >= 1:
+            return  # no near-duplicate check to prime
+        self.batch.append((name, index, row_id, text, metadata, replay))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def finish(self, name):
+        """All of `name`'s chunks were added; its filter is dropped after the next flush"""
+        self.finished.add(name)
+
+    def flush(self):
+        batch, self.batch = self.batch, []
+        if batch:
+            self._write(batch)
+        for name in self.finished:
+            self.dedup.pop(name, None)
+        self.finished.clear()
+
+    def _write(self, batch):
+        names, indexes, ids, texts, metadatas, replays = zip(*batch)
+        vectors = self.store.embeddings.embed_documents(list(texts))
+        keep = np.ones(len(batch), dtype=bool)
+        for name in dict.fromkeys(names):
+            rows = [i for i, row_name in enumerate(names) if row_name == name]
+            keep[rows] = self.dedup[name].keep_mask([vectors[i] for i in rows])
+        for i in range(len(batch)):
+            if not keep[i] and not replays[i]:
+                self.duplicates['near_duplicates'] += 1
+                self.stored[names[i]].add(indexes[i])
+
+        rows = [i for i in range(len(batch)) if keep[i] and not replays[i]]
+        if not rows:
+            return
+        while len(self.inflight) >= self.max_inflight:
+            self._collect(FIRST_COMPLETED)
+        future = self.pool.submit(
+            _with_retry, upsert_embeddings, self.store,
+            [ids[i] for i in rows], [texts[i] for i in rows], [vectors[i] for i in rows],
+            [metadatas[i] for i in rows],
+        )
+        self.inflight[future] = [(names[i], indexes[i]) for i in rows]
+
+    def close(self):
+        self.flush()
+        while self.inflight:
+            self._collect(ALL_COMPLETED)
+        self._checkpoint(final=True)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def _collect(self, return_when):
+        finished, _ = wait(self.inflight, return_when=return_when)
+        error = None
+        for future in finished:
+            rows = self.inflight.pop(future)
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            for name, index in rows:
+                self.stored[name].add(index)
+        if error is not None:
+            self._checkpoint(final=True)
+            raise error
+        if time.monotonic() - self.checkpointed >= CHECKPOINT_SECONDS:
+            self._checkpoint()
+
+    def _checkpoint(self, final=False):
+        # Persist the store before the manifest claims its rows. Batches
+        # finish out of order; a file's checkpoint only advances over a
+        # contiguous run of stored chunks.
+        _persist(self.store, final)
+        self.checkpointed = time.monotonic()
+        for name, stored in self.stored.items():
+            entry = self.manifest.files[name]
+            while entry['upserted'] in stored:
+                stored.remove(entry['upserted'])
+                entry['upserted'] += 1
+        self.manifest.save()
+
+
+def upsert_embeddings(store, ids, texts, vectors, metadatas):
+    """Write precomputed vectors to a LocalVectorStore or PineconeIndexWriter"""
+    store.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=ids)
+
+
+class PineconeIndexWriter:
+    """
+    Ingestion's handle on the Pinecone index: upserts vectors embedded
+    ahead of time and deletes by id. Text goes under the metadata key
+    PineconeVectorStore reads back at query time.
+    """
+    text_key = 'text'
+
+    def __init__(self, index, embeddings):
+        self.index = index
+        self.embeddings = embeddings
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+        text_embeddings = list(text_embeddings)
+        metadatas = metadatas or [{} for _ in text_embeddings]
+        self.index.upsert(vectors=[
+            (row_id, [float(value) for value in vector], dict(metadata, **{self.text_key: text}))
+            for row_id, (text, vector), metadata in zip(ids, text_embeddings, metadatas)
+        ])
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        self.index.delete(ids=ids)
+        return True
+
+
+def _persist(store, final=True):
+    # LocalVectorStore keeps writes in memory until save(); intermediate
+    # checkpoints skip reclustering
+    if hasattr(store, 'save'):
+        store.save(build_ivf=final)
+
+
+def _with_retry(func, *args, attempts=UPSERT_RETRIES):
+    for attempt in range(attempts):
+        try:
+            return func(*args)
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            # Exponential backoff with jitter so parallel batches don't retry in lockstep
+            time.sleep(min(30, 2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def _delete(store, name, entry, batch_size=1000):
+    ids = entry.get('ids') or [chunk_id(name, entry['sha256'], index) for index in range(entry['chunks'])]
+    # Pinecone accepts at most 1000 ids per delete
+    for start in range(0, len(ids), batch_size):
+        store.delete(ids[start:start + batch_size])
+
+
+def _parse(pending, workers, load):
+    """Yield (name, chunks) as each file finishes parsing"""
+    if workers == 1 or len(pending) <= 1:
+        for name, (path, _) in pending.items():
+            yield name, load(path)
+        return
+    workers = workers or os.cpu_count()
+    queue = iter(pending.items())
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Parse at most two files per worker ahead of the embedder
+        futures = {}
+        for name, (path, _) in queue:
+            futures[pool.submit(load, path)] = name
+            if len(futures) >= 2 * workers:
+                break
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield futures.pop(future), future.result()
+                for name, (path, _) in queue:
+                    futures[pool.submit(load, path)] = name
+                    break
+
+
+def open_vector_store(embeddings):
+    """The store ingestion writes to: the one the chatbot retrieves from (see CHATBOT_VECTOR_STORE)"""
+    if VECTOR_STORE == 'local':
+        from .local_vector_store import LocalVectorIndex, LocalVectorStore
+        return LocalVectorStore(LocalVectorIndex.load(LOCAL_INDEX_DIR, EMBEDDING_DIMENSION), embeddings)
+
+    from pinecone import ServerlessSpec
+    from pinecone.grpc import PineconeGRPC as Pinecone
+
+    pc = Pinecone(api_key=os.environ['PINECONE_API_KEY'])
+    if not pc.has_index(PINECONE_INDEX):
+        pc.create_index(
+            name=PINECONE_INDEX,
+            dimension=EMBEDDING_DIMENSION,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-east-1")
+        )
+    return PineconeIndexWriter(pc.Index(PINECONE_INDEX), embeddings)
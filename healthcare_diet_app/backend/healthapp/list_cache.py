@@ -0,0 +1,123 @@
+import hashlib
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.response import Response
+
+# Needs a backend shared by every worker (Redis, Memcached, database): with
+# a per-process one, a write in one process would leave the others serving
+# stale lists and 304s. On LocMemCache the list cache is therefore off
+# unless HEALTHAPP_LIST_CACHE_LOCAL = True says only one process serves
+# requests (runserver, tests).
+CACHE_ALIAS = getattr(settings, 'HEALTHAPP_LIST_CACHE', 'default')
+CACHE_TIMEOUT = getattr(settings, 'HEALTHAPP_LIST_CACHE_TIMEOUT', 300)
+
+FOOD_LOGS = 'foodlog'
+SYMPTOMS = 'symptom'
+
+# Returned by get_cache_date() when the slice cannot be keyed reliably
+NOT_CACHED = object()
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _enabled():
+    backend = _cache()
+    if isinstance(backend, DummyCache):
+        return False
+    if isinstance(backend, LocMemCache):
+        return getattr(settings, 'HEALTHAPP_LIST_CACHE_LOCAL', False)
+    return True
+
+
+def _generation_key(scope, date=None):
+    if date is None:
+        return f'healthapp:gen:{scope}'
+    return f'healthapp:gen:{scope}:date:{date}'
+
+
+def _generation(key):
+    # A missing generation gets a fresh random token rather than restarting
+    # from a fixed value, so an evicted counter can never resurrect old keys.
+    value = _cache().get(key)
+    if value is None:
+        _cache().add(key, uuid.uuid4().hex, None)
+        value = _cache().get(key)
+    return value
+
+
+def _bump(keys):
+    _cache().set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+def as_date(value):
+    """FoodLog.date holds whatever was assigned (datetime, str) until reloaded"""
+    if isinstance(value, datetime):
+        return timezone.localdate(value)
+    if isinstance(value, str):
+        return parse_date(value)
+    return value
+
+
+def invalidate_food_logs(dates=()):
+    """Drop cached food log lists: the full list plus the given ?date= slices"""
+    keys = [_generation_key(FOOD_LOGS)]
+    keys += [_generation_key(FOOD_LOGS, as_date(d)) for d in set(dates) if d is not None]
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def invalidate_symptoms():
+    """Drop cached symptom lists"""
+    keys = [_generation_key(SYMPTOMS)]
+    transaction.on_commit(lambda: _bump(keys))
+
+
+class CachedListMixin:
+    """
+    Serve list() from the cache, keyed by the request URL and the generation
+    of the slice it reads, with an ETag so unchanged lists return 304.
+
+    Views set `cache_scope` and may override `get_cache_date()` to narrow
+    the dependency to a single ?date= slice, or return NOT_CACHED to bypass
+    the cache. Without a shared cache backend lists are not cached.
+    """
+    cache_scope = None
+
+    def get_cache_date(self):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        if not _enabled():
+            return super().list(request, *args, **kwargs)
+        date = self.get_cache_date()
+        if date is NOT_CACHED:
+            return super().list(request, *args, **kwargs)
+        generation = _generation(_generation_key(self.cache_scope, date))
+        url = f'{request.get_host()}{request.get_full_path()}'
+        digest = hashlib.md5(f'{generation}:{url}'.encode('utf-8')).hexdigest()
+        etag = f'"{digest}"'
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = f'healthapp:list:{self.cache_scope}:{digest}'
+            data = _cache().get(key)
+            if data is None:
+                response = super().list(request, *args, **kwargs)
+                _cache().set(key, response.data, CACHE_TIMEOUT)
+            else:
+                response = Response(data)
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,291 @@
+"""
+In-process vector index for the medical chatbot
+
+A NumPy alternative to the Pinecone index: vectors are L2-normalized
+float32 rows, so cosine similarity is one matrix-vector product. The index
+persists to a directory and is memory-mapped on load, so worker processes
+share the pages. Above IVF_MIN_VECTORS rows an inverted-file (IVF) layer
+restricts each search to the `nprobe` nearest k-means clusters.
+"""
+
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from langchain_core.documents import Document
+    from langchain_core.vectorstores import VectorStore
+except ImportError:  # the index itself has no LangChain dependency
+    Document = None
+    VectorStore = object
+
+IVF_MIN_VECTORS = 20000
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LocalVectorIndex:
+    """Flat (or IVF) cosine index over fixed-size vectors with JSON payloads"""
+
+    def __init__(self, dimension, path=None, nprobe=8):
+        self.dimension = dimension
+        self.path = Path(path) if path is not None else None
+        self.nprobe = nprobe
+        self.ids = []
+        self.payloads = []
+        self.centroids = None
+        # Rows [0, len) of these buffers are live; spare capacity lets
+        # upserts append without copying the matrix each time.
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._assignment = np.zeros(0, dtype=np.int32)  # cluster of each row, with centroids
+        self._positions = {}
+        self._lists = None
+        self._ivf_size = 0  # rows when the clusters were last fitted
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def vectors(self):
+        return self._matrix[:len(self.ids)]
+
+    def upsert(self, ids, vectors, payloads):
+        """Insert or replace rows; call save() to persist"""
+        vectors = _normalize(vectors)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dim vectors, got {vectors.shape[1]}")
+        with self._lock:
+            live = len(self.ids)
+            rows = []
+            for row_id, payload in zip(ids, payloads):
+                position = self._positions.get(row_id)
+                if position is None:
+                    position = self._positions[row_id] = len(self.ids)
+                    self.ids.append(row_id)
+                    self.payloads.append(payload)
+                else:
+                    self.payloads[position] = payload
+                rows.append(position)
+            self._reserve(live, len(self.ids))
+            self._matrix[rows] = vectors[:len(rows)]
+            if self.centroids is not None:
+                # New rows join their nearest cluster; save() refits once
+                # the index has doubled since the last fit.
+                self._assignment[rows] = np.argmax(vectors[:len(rows)] @ self.centroids.T, axis=1)
+                self._lists = None
+
+    def delete(self, ids):
+        drop = set(ids)
+        with self._lock:
+            keep = [i for i, row_id in enumerate(self.ids) if row_id not in drop]
+            if len(keep) == len(self.ids):
+                return
+            self._matrix = np.array(self.vectors[keep]).reshape(-1, self.dimension)
+            self._assignment = np.array(self._assignment[:len(self.ids)][keep], dtype=np.int32)
+            self.ids = [self.ids[i] for i in keep]
+            self.payloads = [self.payloads[i] for i in keep]
+            self._positions = {row_id: i for i, row_id in enumerate(self.ids)}
+            self._lists = None
+
+    def search(self, vector, k=3):
+        """Return up to k (id, payload, score) tuples, best first"""
+        query = _normalize(vector)[0]
+        with self._lock:
+            if not self.ids:
+                return []
+            vectors = self.vectors
+            candidates = self._candidates(query)
+            scores = vectors[candidates] @ query if candidates is not None else vectors @ query
+            k = min(k, len(scores))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            rows = candidates[top] if candidates is not None else top
+            return [(self.ids[i], self.payloads[i], float(scores[j])) for i, j in zip(rows, top)]
+
+    def build_ivf(self, n_lists=None, iterations=10, seed=0):
+        """Cluster rows with k-means so searches scan only nearby clusters"""
+        with self._lock:
+            vectors = self.vectors
+            n = len(self.ids)
+            n_lists = n_lists or max(1, int(np.sqrt(n)))
+            rng = np.random.default_rng(seed)
+            centroids = vectors[rng.choice(n, size=n_lists, replace=False)].copy()
+            for _ in range(iterations):
+                assignment = np.argmax(vectors @ centroids.T, axis=1)
+                for c in range(n_lists):
+                    members = vectors[assignment == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+            self.centroids = centroids
+            self._assignment[:n] = np.argmax(vectors @ centroids.T, axis=1)
+            self._lists = None
+            self._ivf_size = n
+
+    def _reserve(self, live, rows):
+        # Grow by doubling; the first write after load() also copies the
+        # read-only memory map. _assignment always has _matrix's capacity.
+        if rows <= len(self._matrix) and self._matrix.flags.writeable:
+            return
+        capacity = max(rows, 2 * len(self._matrix), 1024)
+        matrix = np.empty((capacity, self.dimension), dtype=np.float32)
+        matrix[:live] = self._matrix[:live]
+        assignment = np.zeros(capacity, dtype=np.int32)
+        assignment[:live] = self._assignment[:live]
+        self._matrix, self._assignment = matrix, assignment
+
+    def _candidates(self, query):
+        if self.centroids is None:
+            return None
+        if self._lists is None:
+            assignment = self._assignment[:len(self.ids)]
+            order = np.argsort(assignment, kind='stable')
+            bounds = np.searchsorted(assignment[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+        nearest = np.argsort(-(self.centroids @ query))[:self.nprobe]
+        return np.concatenate([self._lists[c] for c in nearest])
+
+    def save(self, build_ivf=True):
+        """
+        Write the index to `path`. Large indexes are clustered first, and
+        reclustered once they have doubled in size; pass build_ivf=False
+        for cheap intermediate checkpoints.
+        """
+        if build_ivf and len(self) >= IVF_MIN_VECTORS and (
+                self.centroids is None or len(self) >= 2 * self._ivf_size):
+            self.build_ivf()
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            # Each file is replaced atomically: readers (and this process's
+            # own memory map) keep the old file until they reload.
+            self._write('vectors.npy', lambda handle: np.save(handle, self.vectors))
+            self._write('rows.jsonl', lambda handle: handle.writelines(
+                (json.dumps({'id': row_id, 'payload': payload}) + '\n').encode('utf-8')
+                for row_id, payload in zip(self.ids, self.payloads)
+            ))
+            if self.centroids is not None:
+                self._write('centroids.npy', lambda handle: np.save(handle, self.centroids))
+                self._write('assignment.npy', lambda handle: np.save(handle, self._assignment[:len(self.ids)]))
+            else:
+                (self.path / 'centroids.npy').unlink(missing_ok=True)
+                (self.path / 'assignment.npy').unlink(missing_ok=True)
+            meta = {'dimension': self.dimension, 'ivf_size': self._ivf_size}
+            self._write('meta.json', lambda handle: handle.write(json.dumps(meta).encode('utf-8')))
+
+    def _write(self, name, write):
+        partial = self.path / f'{name}.tmp'
+        with open(partial, 'wb') as handle:
+            write(handle)
+        os.replace(partial, self.path / name)
+
+    @classmethod
+    def load(cls, path, dimension, nprobe=8):
+        """Open a saved index (memory-mapped), or an empty one if none exists"""
+        index = cls(dimension, path, nprobe)
+        path = Path(path)
+        if not (path / 'meta.json').exists():
+            return index
+        meta = json.loads((path / 'meta.json').read_text())
+        index._matrix = np.load(path / 'vectors.npy', mmap_mode='r')
+        with open(path / 'rows.jsonl', encoding='utf-8') as handle:
+            for line in handle:
+                row = json.loads(line)
+                index.ids.append(row['id'])
+                index.payloads.append(row['payload'])
+        index._positions = {row_id: i for i, row_id in enumerate(index.ids)}
+        index._assignment = np.zeros(len(index.ids), dtype=np.int32)
+        if (path / 'centroids.npy').exists():
+            index.centroids = np.load(path / 'centroids.npy')
+            index._assignment = np.load(path / 'assignment.npy')
+            index._ivf_size = meta.get('ivf_size', len(index.ids))
+        return index
+
+
+class LocalVectorStore(VectorStore):
+    """
+    LangChain VectorStore over LocalVectorIndex (similarity search only).
+
+    Writes stay in memory until save(), so bulk loads persist once rather
+    than after every batch.
+    """
+
+    def __init__(self, index, embedding):
+        self.index = index
+        self._embedding = embedding
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_embeddings(zip(texts, vectors), metadatas, ids)
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+        """Add (text, vector) pairs that were embedded ahead of time"""
+        text_embeddings = list(text_embeddings)
+        if not text_embeddings:
+            return []
+        texts, vectors = zip(*text_embeddings)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        self.index.upsert(ids, vectors, [
+            {'page_content': text, 'metadata': metadata} for text, metadata in zip(texts, metadatas)
+        ])
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        self.index.delete(ids or [])
+        return True
+
+    def save(self, build_ivf=True):
+        """Persist the index, if it has a path"""
+        if self.index.path is not None:
+            self.index.save(build_ivf=build_ivf)
+
+    def reload(self):
+        """Swap in the index as last saved, e.g. by an ingestion run in another process"""
+        if self.index.path is not None:
+            self.index = LocalVectorIndex.load(self.index.path, self.index.dimension, self.index.nprobe)
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4):
+        return [
+            (Document(id=row_id, page_content=payload['page_content'], metadata=payload['metadata']), score)
+            for row_id, payload, score in self.index.search(embedding, k)
+        ]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, path=None, dimension=None, **kwargs):
+        dimension = dimension or len(embedding.embed_query('dimension probe'))
+        index = LocalVectorIndex(dimension, path)
+        store = cls(index, embedding)
+        store.add_texts(texts, metadatas)
+        store.save()
+        return store
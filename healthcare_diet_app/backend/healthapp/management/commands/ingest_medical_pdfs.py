@@ -0,0 +1,62 @@
+import os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from dotenv import load_dotenv
+
+from healthapp.chatbot_config import (
+    DATA_DIR, ENCODE_BATCH_SIZE, INGEST_BATCH_SIZE, UPSERT_WORKERS,
+)
+from healthapp.ingestion import Manifest, ingest, open_vector_store
+
+
+class Command(BaseCommand):
+    help = "Chunk, embed and upsert new or changed medical PDFs into the chatbot's vector store"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'data_dir', nargs='?', default=DATA_DIR,
+            help="Directory searched recursively for *.pdf (defaults to CHATBOT_DATA_DIR)",
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help="Processes used to parse PDFs (1 parses in this process)",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=INGEST_BATCH_SIZE,
+            help="Chunks embedded and upserted per batch",
+        )
+        parser.add_argument(
+            '--upsert-workers', type=int, default=UPSERT_WORKERS,
+            help="Batches upserted in parallel",
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Re-ingest every file even if its content hash is unchanged",
+        )
+
+    def handle(self, *args, **options):
+        data_dir = Path(options['data_dir'])
+        if not data_dir.is_dir():
+            raise CommandError(f"Data directory not found: {data_dir}")
+
+        load_dotenv()
+        from healthapp.embedding_backends import load_embeddings
+        from healthapp.embedding_cache import cache_embeddings
+
+        embeddings = cache_embeddings(load_embeddings(encode_kwargs={'batch_size': ENCODE_BATCH_SIZE}))
+        report = ingest(
+            data_dir,
+            open_vector_store(embeddings),
+            Manifest(),
+            workers=options['workers'],
+            force=options['force'],
+            batch_size=options['batch_size'],
+            upsert_workers=options['upsert_workers'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "{added} added, {changed} changed, {resumed} resumed, {unchanged} unchanged, {removed} removed; "
+            "{chunks} chunks, {skipped} skipped as duplicates".format(
+                skipped=report['duplicates'] + report['near_duplicates'], **report
+            )
+        ))
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from healthapp.calories import food_calories_csv, read_food_calories
+from healthapp.food_index import reset_food_index
+from healthapp.models import FoodCalorie
+from healthapp.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Load (or refresh) the FoodCalorie table from a food,calories CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'csv_path', nargs='?',
+            default=food_calories_csv(),
+            help="Path to the CSV (defaults to the frontend's public/food_calories.csv)",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['csv_path'])
+        if not path.exists():
+            raise CommandError(f"CSV not found: {path}")
+
+        # Later rows win on duplicate names, as they did in the browser
+        rows = [
+            FoodCalorie(name=name, normalized_name=normalized_name, calories=calories)
+            for normalized_name, (name, calories) in read_food_calories(path).items()
+        ]
+
+        FoodCalorie.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['normalized_name'],
+            update_fields=['name', 'calories'],
+        )
+        reset_food_index()
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(rows)} foods from {path}"))
+
+        # Calorie estimates in the daily rollups depend on this table
+        days = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {days} days"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from healthapp.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyRollup table from every FoodLog and SymptomLog"
+
+    def handle(self, *args, **options):
+        days = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {days} days"))
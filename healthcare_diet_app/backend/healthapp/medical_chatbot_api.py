@@ -4,40 +4,165 @@ Medical Chatbot API for Healthcare App
 A simplified version optimized for web API integration
 """
 
+import asyncio
 import os
+import threading
+import time
+import weakref
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.prompts import ChatPromptTemplate
-from pinecone.grpc import PineconeGRPC as Pinecone
-from pinecone import ServerlessSpec
-import google.generativeai as genai
+
+from .answer_cache import AnswerCache
+from .chatbot_config import (
+    EMBEDDING_DIMENSION, GEMINI_MAX_INFLIGHT, GEMINI_RPM, GEMINI_TIMEOUT, LOCAL_INDEX_DIR, PINECONE_INDEX,
+    QUERY_BATCH_SIZE, QUERY_BATCH_WAIT, VECTOR_STORE,
+)
+
+# LangChain, torch/transformers, Pinecone and the Gemini SDK are imported in
+# _build_rag_chain: importing this module (status endpoint, warm-up check)
+# must stay cheap for workers that never answer a question.
 
 
 _rag_chain = None
 _initialized = False
+_init_lock = threading.Lock()
+_state = 'not_started'
+_init_error = None
+_init_seconds = None
+_embeddings = None
+_embedding_model = None
+_query_batcher = None
+_query_batch_size = QUERY_BATCH_SIZE
+_gemini_processes = 1  # processes sharing the GEMINI_RPM quota
+_retriever = None
+_gemini = None
+
+# Near-identical questions reuse an earlier answer; the semantic lookup is
+# enabled once the embedding model is loaded. CHATBOT_ANSWER_CACHE_SIZE=0
+# turns the cache off.
+_answer_cache = AnswerCache(
+    threshold=float(os.environ.get('CHATBOT_ANSWER_CACHE_THRESHOLD', '0.92')),
+    ttl=float(os.environ.get('CHATBOT_ANSWER_CACHE_TTL', '3600')),
+    max_size=int(os.environ.get('CHATBOT_ANSWER_CACHE_SIZE', '512')),
+)
+
+# Async paths: at most this many chains in flight per event loop, and a
+# deadline (seconds) covering both the wait for a slot and the call itself.
+MAX_INFLIGHT = int(os.environ.get('CHATBOT_MAX_INFLIGHT', '200'))
+REQUEST_TIMEOUT = float(os.environ.get('CHATBOT_TIMEOUT', '30'))
+# asyncio primitives are bound to one loop. Under ASGI that is the server's
+# loop; under WSGI async_to_sync gives each request its own.
+_inflight = weakref.WeakKeyDictionary()  # event loop -> Semaphore
+
+# Seed documents for an empty index
+SAMPLE_DOCS = [
+    "Diabetes is a chronic disease that affects how your body turns food into energy.",
+    "Hypertension, or high blood pressure, is when your blood pressure is consistently too high.",
+    "Asthma is a condition that affects the airways in the lungs, making it difficult to breathe.",
+    "Heart disease refers to several types of heart conditions that can affect heart function.",
+    "Obesity is a complex disease involving an excessive amount of body fat."
+]
+
+
+def load_embedding_model():
+    """
+    The MiniLM model on the CHATBOT_EMBEDDING_BACKEND backend, loaded once
+    per process.
+
+    Holds no files or connections, so a process that calls this before
+    forking (the chatbot worker pool's fork server) shares the weights with
+    its children copy-on-write.
+    """
+    global _embedding_model
+    if _embedding_model is None:
+        from .embedding_backends import load_embeddings
+        _embedding_model = load_embeddings()
+    return _embedding_model
+
+def configure_pool_worker(workers):
+    """
+    Set up this process as one of `workers` chatbot pool processes.
+
+    Each answers one question at a time, so questions are embedded as soon
+    as they arrive (the batcher would only add QUERY_BATCH_WAIT of delay),
+    and it gets 1/workers of GEMINI_RPM and GEMINI_MAX_INFLIGHT so the pool
+    as a whole stays within the quota. Call before the chain is built.
+    """
+    global _query_batch_size, _gemini_processes
+    _query_batch_size = 1
+    _gemini_processes = max(1, workers)
 
 def initialize_chatbot():
     """Initialize the chatbot system once and cache the components"""
-    global _rag_chain, _initialized
-    
+    global _state, _init_error, _init_seconds
+
     if _initialized:
         return _rag_chain
-    
+
+    # Concurrent first requests (or a request racing warm_up) wait here
+    # for the one initialization instead of each building their own chain.
+    with _init_lock:
+        if _initialized:
+            return _rag_chain
+        _state = 'warming'
+        started = time.monotonic()
+        try:
+            chain = _build_rag_chain()
+        except Exception as e:
+            _state = 'failed'
+            _init_error = str(e)
+            raise
+        _init_seconds = round(time.monotonic() - started, 2)
+        _init_error = None
+        _state = 'ready'
+        return chain
+
+def warm_up(background=True):
+    """
+    Initialize the chatbot ahead of the first question.
+
+    With background=True this returns immediately and loads the embedding
+    model, Pinecone connection and Gemini client on a daemon thread; any
+    request arriving meanwhile waits on the same lock rather than starting
+    a second initialization. Failures are reported by get_chatbot_status().
+    """
+    def run():
+        try:
+            initialize_chatbot()
+        except Exception:
+            pass
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name='chatbot-warmup', daemon=True)
+    thread.start()
+    return thread
+
+def _build_rag_chain():
+    global _rag_chain, _initialized, _embeddings, _gemini, _query_batcher, _retriever
+
     try:
-        
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from langchain.chains import create_retrieval_chain
+        from langchain.chains.combine_documents import create_stuff_documents_chain
+        from langchain_core.prompts import ChatPromptTemplate
+        import google.generativeai as genai
+
+        from .embedding_cache import cache_embeddings
+        from .gemini_client import GeminiClient
+        from .local_vector_store import LocalVectorIndex, LocalVectorStore
+        from .query_batcher import MicroBatchingEmbeddings
+        from .retrieval_cache import CachedRetriever, bump_index_version
+
         load_dotenv()
         
         gemini_key = os.environ.get('GEMINI_API_KEY')
         pinecone_key = os.environ.get('PINECONE_API_KEY')
         
-        if not gemini_key or not pinecone_key:
+        if not gemini_key or (VECTOR_STORE == 'pinecone' and not pinecone_key):
             raise ValueError("API keys not found in environment variables")
+        if VECTOR_STORE not in ('pinecone', 'local'):
+            raise ValueError(f"Unknown CHATBOT_VECTOR_STORE: {VECTOR_STORE}")
         
         # Configure Gemini
         genai.configure(api_key=gemini_key)
@@ -55,7 +180,9 @@ def initialize_chatbot():
                     model=model_name,
                     temperature=0.4,
                     max_output_tokens=500,
-                    google_api_key=gemini_key
+                    google_api_key=gemini_key,
+                    max_retries=1,  # GeminiClient retries with backoff
+                    timeout=GEMINI_TIMEOUT,
                 )
                 break
             except Exception as e:
@@ -63,58 +190,71 @@ def initialize_chatbot():
                 continue
         if llm is None:
             raise RuntimeError(f"Failed to initialize Gemini LLM with any supported model: {last_error}")
+        # Rate limit, cap and retry every Gemini call made by this process
+        llm = _gemini = GeminiClient(
+            llm,
+            requests_per_minute=GEMINI_RPM / _gemini_processes,
+            max_inflight=max(1, GEMINI_MAX_INFLIGHT // _gemini_processes),
+        )
         
         # Setup embeddings
-        embeddings = HuggingFaceEmbeddings(
-            model_name='sentence-transformers/all-MiniLM-L6-v2'
+        # Cache misses from concurrent questions are encoded in one batch
+        _query_batcher = MicroBatchingEmbeddings(
+            load_embedding_model(), max_batch_size=_query_batch_size, max_wait=QUERY_BATCH_WAIT
         )
+        embeddings = cache_embeddings(_query_batcher)
+        _embeddings = embeddings
+        _answer_cache.embed = embeddings.embed_query
         
-        # Setup Pinecone
-        pc = Pinecone(api_key=pinecone_key)
-        index_name = "healthcare-medicalbot"
+        # Setup vector store
+        if VECTOR_STORE == 'local':
+            docsearch = LocalVectorStore(
+                LocalVectorIndex.load(LOCAL_INDEX_DIR, EMBEDDING_DIMENSION),
+                embeddings
+            )
+            if not len(docsearch.index):
+                docsearch.add_texts(SAMPLE_DOCS)
+                docsearch.save()
+                bump_index_version()
+        else:
+            # Setup Pinecone
+            from langchain_pinecone import PineconeVectorStore
+            from pinecone.grpc import PineconeGRPC as Pinecone
+            from pinecone import ServerlessSpec
+
+            pc = Pinecone(api_key=pinecone_key)
+            index_name = PINECONE_INDEX
         
         
-        try:
-            pc.create_index(
-                name=index_name,
-                dimension=384,
-                metric="cosine",
-                spec=ServerlessSpec(cloud="aws", region="us-east-1")
-            )
-        except:
-            pass  
+            try:
+                pc.create_index(
+                    name=index_name,
+                    dimension=384,
+                    metric="cosine",
+                    spec=ServerlessSpec(cloud="aws", region="us-east-1")
+                )
+            except:
+                pass  
         
-        # Setup vector store
-        try:
-           
-            docsearch = PineconeVectorStore.from_existing_index(
-                index_name=index_name,
-                embedding=embeddings
-            )
-        except:
+            try:
            
-            sample_docs = [
-                "Diabetes is a chronic disease that affects how your body turns food into energy.",
-                "Hypertension, or high blood pressure, is when your blood pressure is consistently too high.",
-                "Asthma is a condition that affects the airways in the lungs, making it difficult to breathe.",
-                "Heart disease refers to several types of heart conditions that can affect heart function.",
-                "Obesity is a complex disease involving an excessive amount of body fat."
-            ]
-            
-            from langchain.schema import Document
-            documents = [Document(page_content=doc) for doc in sample_docs]
+                docsearch = PineconeVectorStore.from_existing_index(
+                    index_name=index_name,
+                    embedding=embeddings
+                )
+            except:
+                from langchain.schema import Document
+                documents = [Document(page_content=doc) for doc in SAMPLE_DOCS]
             
-            docsearch = PineconeVectorStore.from_documents(
-                documents=documents,
-                index_name=index_name,
-                embedding=embeddings
-            )
+                docsearch = PineconeVectorStore.from_documents(
+                    documents=documents,
+                    index_name=index_name,
+                    embedding=embeddings
+                )
+                bump_index_version()
         
-        # Setup retriever
-        retriever = docsearch.as_retriever(
-            search_type="similarity", 
-            search_kwargs={"k": 3}
-        )
+        # Setup retriever (top 3 by similarity, cached until the index changes)
+        retriever = _retriever = CachedRetriever(docsearch, embeddings, k=3)
         
         # Create RAG chain
         system_prompt = (
@@ -144,17 +284,107 @@ def initialize_chatbot():
 def ask_medical_question(question):
     """Ask a medical question and get an answer"""
     try:
-        if not _initialized:
-            initialize_chatbot()
+        rag_chain = initialize_chatbot()
+
+        answer, vector = _answer_cache.get(question)
+        if answer is not None:
+            return answer
         
-        response = _rag_chain.invoke({"input": question})
+        response = rag_chain.invoke({"input": question})
+        _answer_cache.put(question, response['answer'], vector)
         return response['answer']
         
     except Exception as e:
         return f"I'm sorry, I encountered an error: {str(e)}. Please try again or contact support."
 
+async def aask_medical_question(question):
+    """
+    Async counterpart of ask_medical_question for the ASGI app.
+
+    Awaits the chain's ainvoke() so a pending Gemini call holds no thread.
+    Raises asyncio.TimeoutError once REQUEST_TIMEOUT passes; other errors
+    propagate to the caller.
+    """
+    from asgiref.sync import sync_to_async
+
+    rag_chain = await sync_to_async(initialize_chatbot, thread_sensitive=False)()
+    answer, vector = await sync_to_async(_answer_cache.get, thread_sensitive=False)(question)
+    if answer is not None:
+        return answer
+
+    async def invoke():
+        async with _inflight_slots():
+            return await rag_chain.ainvoke({"input": question})
+
+    response = await asyncio.wait_for(invoke(), timeout=REQUEST_TIMEOUT)
+    _answer_cache.put(question, response['answer'], vector)
+    return response['answer']
+
+async def astream_medical_answer(question):
+    """
+    Yield the answer to a medical question piece by piece as Gemini writes it.
+
+    Uses the retrieval chain's astream(), so the first piece arrives after
+    retrieval plus the first generated tokens rather than the full answer.
+    Raises asyncio.TimeoutError once REQUEST_TIMEOUT passes; other errors
+    propagate to the caller, which decides how to report them.
+    """
+    from asgiref.sync import sync_to_async
+
+    # Initialization and the cache's embedding call are blocking; keep them
+    # off the event loop.
+    rag_chain = await sync_to_async(initialize_chatbot, thread_sensitive=False)()
+    answer, vector = await sync_to_async(_answer_cache.get, thread_sensitive=False)(question)
+    if answer is not None:
+        yield answer
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + REQUEST_TIMEOUT
+    slots = _inflight_slots()
+    await asyncio.wait_for(slots.acquire(), timeout=REQUEST_TIMEOUT)
+    pieces = []
+    stream = rag_chain.astream({"input": question})
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(stream.__anext__(), timeout=max(0, deadline - loop.time()))
+            except StopAsyncIteration:
+                break
+            piece = chunk.get('answer')
+            if piece:
+                pieces.append(piece)
+                yield piece
+    finally:
+        slots.release()
+        await stream.aclose()
+    _answer_cache.put(question, ''.join(pieces), vector)
+
+def _inflight_slots():
+    loop = asyncio.get_running_loop()
+    semaphore = _inflight.get(loop)
+    if semaphore is None:
+        semaphore = _inflight[loop] = asyncio.Semaphore(MAX_INFLIGHT)
+    return semaphore
+
+def readiness():
+    """This process's chain: its state, build time and last error"""
+    return {'state': _state, 'init_seconds': _init_seconds, 'error': _init_error}
+
+def record_pool_readiness(state, init_seconds=None, error=None):
+    """
+    Report the worker pool's readiness as this process's own.
+
+    With CHATBOT_WORKERS the chain is built in the workers, so the web
+    process would otherwise stay 'not_started' however warm the pool is.
+    """
+    global _state, _init_seconds, _init_error
+    _state, _init_seconds, _init_error = state, init_seconds, error
+
 def get_chatbot_status():
     """Get the status of the chatbot system"""
+    from . import chatbot_workers
+
     try:
         gemini_key = os.environ.get('GEMINI_API_KEY')
         pinecone_key = os.environ.get('PINECONE_API_KEY')
@@ -162,7 +392,18 @@ def get_chatbot_status():
         status = {
             'gemini_api_key': '✓' if gemini_key else '✗',
             'pinecone_api_key': '✓' if pinecone_key else '✗',
-            'initialized': _initialized
+            'initialized': _initialized,
+            'state': _state,
+            'init_seconds': _init_seconds,
+            'error': _init_error,
+            'answer_cache': _answer_cache.stats(),
+            'max_inflight': MAX_INFLIGHT,
+            'embedding_cache': _embeddings.stats() if _embeddings is not None else None,
+            'query_batching': _query_batcher.stats() if _query_batcher is not None else None,
+            'retrieval_cache': _retriever.cache.stats() if _retriever is not None else None,
+            'vector_store': VECTOR_STORE,
+            'gemini': _gemini.stats() if _gemini is not None else None,
+            'workers': chatbot_workers.stats(),
         }
         
         return status
@@ -5,10 +5,11 @@ A RAG-based medical question answering system
 """
 
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains import create_retrieval_chain
@@ -18,6 +19,18 @@ from pinecone.grpc import PineconeGRPC as Pinecone
 from pinecone import ServerlessSpec
 import google.generativeai as genai
 
+# Run as a script (python healthapp/medical_chatbot_gemini.py) only this
+# file's directory is on sys.path; the shared healthapp helpers need the
+# backend directory.
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from healthapp.chatbot_config import GEMINI_TIMEOUT
+from healthapp.embedding_backends import load_embeddings
+from healthapp.embedding_cache import cache_embeddings
+from healthapp.gemini_client import GeminiClient
+from healthapp.retrieval_cache import bump_index_version
+
 def load_environment():
     """Load environment variables"""
     load_dotenv()
@@ -59,9 +72,7 @@ def split_text(documents):
 def setup_embeddings():
     """Setup HuggingFace embeddings"""
     print("🔤 Setting up embeddings...")
-    embeddings = HuggingFaceEmbeddings(
-        model_name='sentence-transformers/all-MiniLM-L6-v2'
-    )
+    embeddings = cache_embeddings(load_embeddings())
     print("✅ Embeddings setup complete")
     return embeddings
 
@@ -102,6 +113,7 @@ def setup_vectorstore(text_chunks, embeddings, index_name):
             index_name=index_name,
             embedding=embeddings
         )
+        bump_index_version()
         print("✅ Created new vector store with documents")
     
     return docsearch
@@ -127,7 +139,9 @@ def setup_gemini_llm(gemini_key):
                 model=model_name,
                 temperature=0.4,
                 max_output_tokens=500,
-                google_api_key=gemini_key
+                google_api_key=gemini_key,
+                max_retries=1,  # GeminiClient retries with backoff
+                timeout=GEMINI_TIMEOUT,
             )
             break
         except Exception as e:
@@ -137,7 +151,7 @@ def setup_gemini_llm(gemini_key):
         raise RuntimeError(f"Failed to initialize Gemini LLM with any supported model: {last_error}")
     
     print("✅ Gemini LLM setup complete")
-    return llm
+    return GeminiClient(llm)
 
 def create_rag_chain(retriever, llm):
     """Create RAG chain"""
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthapp', '0003_symptomlog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodlog',
+            index=models.Index(fields=['-date', '-created_at', '-id'], name='foodlog_date_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='symptomlog',
+            index=models.Index(fields=['-occurred_at', '-id'], name='symptomlog_occurred_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='symptomlog',
+            index=models.Index(fields=['food_log', '-occurred_at'], name='symptomlog_foodlog_occ_idx'),
+        ),
+    ]
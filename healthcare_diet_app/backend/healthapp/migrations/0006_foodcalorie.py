@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthapp', '0005_foodlog_symptomlog_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodCalorie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('normalized_name', models.CharField(max_length=100, unique=True)),
+                ('calories', models.IntegerField(help_text='Calories per reference portion')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthapp', '0006_foodcalorie'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('entries', models.IntegerField(default=0)),
+                ('meals', models.IntegerField(default=0)),
+                ('estimated_calories', models.IntegerField(default=0)),
+                ('symptom_count', models.IntegerField(default=0)),
+                ('max_severity', models.IntegerField(blank=True, null=True)),
+            ],
+        ),
+    ]
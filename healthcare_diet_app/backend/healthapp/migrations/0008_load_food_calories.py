@@ -0,0 +1,44 @@
+import csv
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations
+
+# Frozen copy of the CSV reading in healthapp.calories at the time of this
+# migration, so later changes there cannot alter it
+DEFAULT_CSV = Path(__file__).resolve().parents[3] / 'frontend' / 'healthify' / 'public' / 'food_calories.csv'
+
+
+def load_food_calories(apps, schema_editor):
+    # Seed the table on deploy; until then every calorie estimate reads 0.
+    # `manage.py load_food_calories` refreshes it later.
+    FoodCalorie = apps.get_model('healthapp', 'FoodCalorie')
+    path = Path(getattr(settings, 'HEALTHAPP_FOOD_CALORIES_CSV', DEFAULT_CSV))
+    if FoodCalorie.objects.exists() or not path.exists():
+        return
+    rows = {}
+    with path.open(newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle):
+            name = (row.get('food') or '').strip()
+            try:
+                calories = int(row.get('calories') or '')
+            except ValueError:
+                continue
+            if name:
+                rows[re.sub(r'\s+', ' ', name).lower()] = (name, calories)
+    FoodCalorie.objects.bulk_create(
+        FoodCalorie(name=name, normalized_name=normalized_name, calories=calories)
+        for normalized_name, (name, calories) in rows.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthapp', '0007_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(load_food_calories, migrations.RunPython.noop),
+    ]
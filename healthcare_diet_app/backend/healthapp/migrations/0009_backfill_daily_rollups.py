@@ -0,0 +1,89 @@
+import re
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+# Frozen copies of healthapp.calories at the time of this migration, so
+# later changes there cannot alter it
+SERVING_FACTOR = 5
+_LEADING_QUANTITY = re.compile(
+    r'\s*(?:(?P<whole>\d+)\s+(?P<num>\d+)\s*/\s*(?P<den>\d+)'
+    r'|(?P<fnum>\d+)\s*/\s*(?P<fden>\d+)'
+    r'|(?P<number>\d+(?:\.\d*)?|\.\d+))'
+    r'\s*(?P<unit>(?:g|gm|gms|grams?|kg|mg|ml|l|litres?|liters?|oz|lbs?)\b)?'
+)
+_QUANTITY_WORDS = {'half': 0.5, 'quarter': 0.25, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5}
+
+
+def _normalize(name):
+    return re.sub(r'\s+', ' ', name or '').strip().lower()
+
+
+def _multiplier(quantity):
+    quantity = (quantity or '').lower()
+    match = _LEADING_QUANTITY.match(quantity)
+    if match:
+        if match['unit']:
+            return 1
+        if match['number']:
+            return float(match['number'])
+        numerator, denominator = (match['num'], match['den']) if match['whole'] else (match['fnum'], match['fden'])
+        if not int(denominator):
+            return 1
+        return int(match['whole'] or 0) + int(numerator) / int(denominator)
+    for word in re.findall(r'[a-z]+', quantity):
+        if word in _QUANTITY_WORDS:
+            return _QUANTITY_WORDS[word]
+    return 1
+
+
+def backfill_daily_rollups(apps, schema_editor):
+    # Signals only keep rollups current from 0007 on; days logged before
+    # that get a row here. Calories use exact food names only; foods that
+    # need the fuzzy match count 0 until `manage.py rebuild_daily_rollups`.
+    FoodLog = apps.get_model('healthapp', 'FoodLog')
+    SymptomLog = apps.get_model('healthapp', 'SymptomLog')
+    FoodCalorie = apps.get_model('healthapp', 'FoodCalorie')
+    DailyRollup = apps.get_model('healthapp', 'DailyRollup')
+
+    calories = dict(FoodCalorie.objects.values_list('normalized_name', 'calories'))
+    days = defaultdict(lambda: {'entries': 0, 'meals': set(), 'calories': 0})
+    for log in FoodLog.objects.values('date', 'food', 'quantity', 'meal').iterator():
+        day = days[log['date']]
+        day['entries'] += 1
+        day['meals'].add(log['meal'])
+        day['calories'] += round(
+            calories.get(_normalize(log['food']), 0) * SERVING_FACTOR * _multiplier(log['quantity'])
+        )
+    symptoms = {
+        row['food_log__date']: row
+        for row in SymptomLog.objects.values('food_log__date').annotate(count=Count('id'), max_severity=Max('severity'))
+    }
+
+    DailyRollup.objects.bulk_create(
+        (
+            DailyRollup(
+                date=date,
+                entries=day['entries'],
+                meals=len(day['meals']),
+                estimated_calories=day['calories'],
+                symptom_count=symptoms.get(date, {}).get('count', 0),
+                max_severity=symptoms.get(date, {}).get('max_severity'),
+            )
+            for date, day in days.items()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,  # days already kept current by the signals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('healthapp', '0008_load_food_calories'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_rollups, migrations.RunPython.noop),
+    ]
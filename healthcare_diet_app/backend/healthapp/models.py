@@ -8,6 +8,14 @@ class FoodLog(models.Model):
     meal = models.CharField(max_length=50)
     date = models.DateField(default=now)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # List ordering and keyset pagination; the leading date column
+            # also serves the ?date= filter and date-range scans.
+            models.Index(fields=['-date', '-created_at', '-id'], name='foodlog_date_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.food} ({self.meal}) on {self.date}"
@@ -19,6 +27,36 @@ class SymptomLog(models.Model):
     severity = models.IntegerField(help_text="Rate severity from 1 (mild) to 10 (severe)")
     notes = models.TextField(blank=True, null=True)
     occurred_at = models.DateTimeField(default=now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-occurred_at', '-id'], name='symptomlog_occurred_idx'),
+            models.Index(fields=['food_log', '-occurred_at'], name='symptomlog_foodlog_occ_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.symptom} (Severity: {self.severity}) for {self.food_log}"
+
+
+class FoodCalorie(models.Model):
+    name = models.CharField(max_length=100)
+    normalized_name = models.CharField(max_length=100, unique=True)
+    calories = models.IntegerField(help_text="Calories per reference portion")
+
+    def __str__(self):
+        return f"{self.name} ({self.calories} cal)"
+
+
+
+class DailyRollup(models.Model):
+    """Per-day totals kept in step with FoodLog/SymptomLog (see rollups.py)"""
+    date = models.DateField(unique=True)
+    entries = models.IntegerField(default=0)
+    meals = models.IntegerField(default=0)
+    estimated_calories = models.IntegerField(default=0)
+    symptom_count = models.IntegerField(default=0)
+    max_severity = models.IntegerField(null=True, blank=True)
 
     def __str__(self):
-        return f"{self.symptom} (Severity: {self.severity}) for {self.food_log}"
\ No newline at end of file
+        return f"{self.date}: {self.entries} entries, {self.estimated_calories} cal"
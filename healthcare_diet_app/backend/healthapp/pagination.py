@@ -0,0 +1,137 @@
+import json
+from base64 import b64decode, b64encode
+from functools import reduce
+import operator
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over a fixed, multi-column ordering.
+
+    The cursor stores the ordering values of the last row on the page, so the
+    next page is a single indexed range scan no matter how deep the client
+    pages. The last ordering field must be unique to keep cursors stable.
+    """
+    ordering = ()
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+
+        reverse, position = self.decode_cursor(request)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._flip(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.first_position = self._position(results[0]) if results else None
+        self.last_position = self._position(results[-1]) if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(False, self.last_position)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.encode_cursor(True, self.first_position)
+
+    def encode_cursor(self, reverse, position):
+        payload = json.dumps({'r': int(reverse), 'p': position})
+        encoded = b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')).decode('ascii'))
+            names = self._names()
+            if len(payload['p']) != len(names):
+                raise ValueError(encoded)
+            position = [
+                self._field(name).to_python(value)
+                for name, value in zip(names, payload['p'])
+            ]
+            return bool(payload['r']), position
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _position(self, obj):
+        return [self._field(name).value_to_string(obj) for name in self._names()]
+
+    def _names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _field(self, name):
+        return self.model._meta.get_field(name)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    @staticmethod
+    def _after(ordering, position):
+        # (a, b, c) after (x, y, z) == a > x OR (a = x AND b > y) OR ...
+        clauses = []
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {ordering[j].lstrip('-'): position[j] for j in range(i)}
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': position[i]}))
+        return reduce(operator.or_, clauses)
+
+
+class FoodLogPagination(KeysetPagination):
+    ordering = ('-date', '-created_at', '-id')
+
+
+class SymptomLogPagination(KeysetPagination):
+    ordering = ('-occurred_at', '-id')
@@ -0,0 +1,118 @@
+"""
+Micro-batching for query embeddings
+
+Concurrent chatbot requests each embed one question. MicroBatchingEmbeddings
+queues those calls for up to `max_wait` seconds and encodes them together in
+one forward pass, which costs little more than encoding a single question
+on a CPU, then hands each caller its own vector.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+
+try:
+    from langchain_core.embeddings import Embeddings
+except ImportError:  # batcher stays usable without LangChain (tests, tools)
+    Embeddings = object
+
+
+class _Pending:
+    __slots__ = ('text', 'vector', 'error', 'done')
+
+    def __init__(self, text):
+        self.text = text
+        self.vector = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Wraps `embeddings` so concurrent embed_query() calls share one
+    embed_documents() call of at most `max_batch_size` texts.
+
+    Only valid for models that embed queries and documents the same way
+    (all-MiniLM-L6-v2 does). `max_batch_size=1` turns batching off.
+    """
+
+    def __init__(self, embeddings, max_batch_size=32, max_wait=0.005):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        if self.max_batch_size <= 1:
+            return self.embeddings.embed_query(text)
+        self._start()
+        pending = _Pending(text)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.vector
+
+    async def aembed_documents(self, texts):
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_documents, texts)
+
+    async def aembed_query(self, text):
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_query, text)
+
+    def stats(self):
+        with self._stats_lock:
+            sizes = dict(sorted(self._batch_sizes.items()))
+        batches = sum(sizes.values())
+        queries = sum(size * count for size, count in sizes.items())
+        return {
+            'batches': batches,
+            'queries': queries,
+            'mean_batch_size': round(queries / batches, 2) if batches else 0.0,
+            'batch_sizes': sizes,
+        }
+
+    def _start(self):
+        # Started on first use rather than in __init__, so a process that
+        # builds this and then forks does not leave children without it.
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name='query-embedding-batcher', daemon=True
+                    )
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._encode(batch)
+
+    def _encode(self, batch):
+        try:
+            vectors = self.embeddings.embed_documents([pending.text for pending in batch])
+        except Exception as e:
+            for pending in batch:
+                pending.error = e
+        else:
+            for pending, vector in zip(batch, vectors):
+                pending.vector = vector
+        finally:
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+            for pending in batch:
+                pending.done.set()
@@ -0,0 +1,150 @@
+"""
+Retrieval result cache for the medical chatbot
+
+The RAG chain's retriever embeds the question and asks the vector store for
+the top-k passages. When the corpus has not changed, the same question
+embedding always gets the same passages, so CachedRetriever keeps them in
+an LRU keyed by a hash of the embedding and k.
+
+Entries are tied to an index version: a token in INDEX_VERSION_PATH that
+ingestion rewrites after every change to the store. Processes notice the
+new token within VERSION_CHECK_SECONDS and drop their cache, so answers
+never come from passages of an older corpus. A search that started before
+the drop is not stored after it, and CachedRetriever reloads a store that
+reads a saved index (the local one) before searching the new version.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from .chatbot_config import INDEX_VERSION_PATH, RETRIEVAL_CACHE_SIZE
+
+try:
+    from langchain_core.runnables import Runnable
+except ImportError:  # cache stays usable without LangChain (tests, tools)
+    Runnable = object
+
+VERSION_CHECK_SECONDS = 1.0
+
+
+def bump_index_version(path=INDEX_VERSION_PATH):
+    """Mark the vector store as changed; every retrieval cache starts over"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix('.tmp')
+    partial.write_text(uuid.uuid4().hex, encoding='utf-8')
+    os.replace(partial, path)
+
+
+class RetrievalCache:
+    """Thread-safe LRU of retrieval results, invalidated by the index version"""
+
+    def __init__(self, max_size=RETRIEVAL_CACHE_SIZE, version_path=INDEX_VERSION_PATH):
+        self.max_size = max_size
+        self.version_path = version_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = float('-inf')
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, vector, k):
+        """(documents or None, index version); pass the version on to put()"""
+        key = self._key(vector, k)
+        with self._lock:
+            self._check_version()
+            if self.max_size <= 0:
+                return None, self._version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(self._entries[key]), self._version
+            self.misses += 1
+            return None, self._version
+
+    def put(self, vector, k, documents, version):
+        """Store a search result unless the index changed since get() returned `version`"""
+        if self.max_size <= 0:
+            return
+        key = self._key(vector, k)
+        with self._lock:
+            self._check_version()
+            if version != self._version:
+                return
+            self._entries[key] = list(documents)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def version(self):
+        with self._lock:
+            self._check_version()
+            return self._version
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'version': self._version}
+
+    @staticmethod
+    def _key(vector, k):
+        digest = hashlib.sha256(np.asarray(vector, dtype=np.float32).tobytes()).hexdigest()
+        return f'{k}:{digest}'
+
+    def _check_version(self):
+        # Callers hold the lock; the file is read at most once a second
+        now = time.monotonic()
+        if now - self._checked_at < VERSION_CHECK_SECONDS:
+            return
+        self._checked_at = now
+        try:
+            version = self.version_path.read_text(encoding='utf-8').strip()
+        except FileNotFoundError:
+            version = ''
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+
+class CachedRetriever(Runnable):
+    """
+    Retriever for create_retrieval_chain: question in, top-k Documents out.
+
+    Takes the question itself or the chain's input dict ({'input': question}).
+    Embeds the question once and searches by vector, so a cache miss costs
+    the same as the store's own retriever.
+    """
+
+    def __init__(self, vectorstore, embeddings, k=3, cache=None):
+        self.vectorstore = vectorstore
+        self.embeddings = embeddings
+        self.k = k
+        self.cache = cache if cache is not None else RetrievalCache()
+        self._store_version = self.cache.version()
+        self._reload_lock = threading.Lock()
+
+    def invoke(self, input, config=None, **kwargs):
+        question = input['input'] if isinstance(input, dict) else input
+        vector = self.embeddings.embed_query(question)
+        documents, version = self.cache.get(vector, self.k)
+        if version != self._store_version:
+            self._reload()
+        if documents is None:
+            documents = self.vectorstore.similarity_search_by_vector(vector, k=self.k)
+            self.cache.put(vector, self.k, documents, version)
+        return documents
+
+    def _reload(self):
+        # Pinecone serves the new corpus by itself; the local store only
+        # sees what it loaded. Callers holding an older version skip this.
+        with self._reload_lock:
+            version = self.cache.version()
+            if version != self._store_version:
+                if hasattr(self.vectorstore, 'reload'):
+                    self.vectorstore.reload()
+                self._store_version = version
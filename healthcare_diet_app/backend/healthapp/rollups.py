@@ -0,0 +1,102 @@
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .calories import estimate_calories
+from .list_cache import as_date
+from .models import DailyRollup, FoodLog, SymptomLog
+
+_pending = threading.local()
+
+
+def _pending_sets():
+    if not hasattr(_pending, 'dates'):
+        _pending.dates = set()
+        _pending.food_log_ids = set()
+    return _pending.dates, _pending.food_log_ids
+
+
+def schedule_refresh(dates=(), food_log_ids=()):
+    """
+    Refresh the rollups for `dates` (and the days of `food_log_ids`) once the
+    current transaction commits.
+
+    Work is collected per thread, so a bulk write or cascade delete that
+    fires many signals still recomputes each touched day only once.
+    """
+    pending_dates, pending_ids = _pending_sets()
+    pending_dates.update(as_date(d) for d in dates if d is not None)
+    pending_ids.update(pk for pk in food_log_ids if pk is not None)
+    # robust: a failed refresh is logged, not raised into the request that
+    # already committed; rebuild_daily_rollups repairs any drift.
+    transaction.on_commit(_flush, robust=True)
+
+
+def _flush():
+    pending_dates, pending_ids = _pending_sets()
+    dates, ids = set(pending_dates), set(pending_ids)
+    pending_dates.clear()
+    pending_ids.clear()
+    if ids:
+        dates.update(FoodLog.objects.filter(pk__in=ids).values_list('date', flat=True))
+    if dates:
+        refresh_rollups(dates)
+
+
+def refresh_rollups(dates):
+    """Recompute the DailyRollup rows for the given days from their logs"""
+    dates = set(dates)
+    logs_by_day = defaultdict(list)
+    for log in FoodLog.objects.filter(date__in=dates).values('date', 'food', 'quantity', 'meal'):
+        logs_by_day[log['date']].append(log)
+
+    symptoms_by_day = {
+        row['food_log__date']: row
+        for row in (
+            SymptomLog.objects
+            .filter(food_log__date__in=dates)
+            .values('food_log__date')
+            .annotate(count=Count('id'), max_severity=Max('severity'))
+        )
+    }
+
+    all_logs = [log for logs in logs_by_day.values() for log in logs]
+    for log, calories in zip(all_logs, estimate_calories(all_logs)):
+        log['calories'] = calories
+
+    rollups = []
+    for day in dates:
+        logs = logs_by_day.get(day, [])
+        symptoms = symptoms_by_day.get(day, {})
+        if not logs and not symptoms:
+            continue
+        rollups.append(DailyRollup(
+            date=day,
+            entries=len(logs),
+            meals=len({log['meal'] for log in logs}),
+            estimated_calories=sum(log['calories'] for log in logs),
+            symptom_count=symptoms.get('count', 0),
+            max_severity=symptoms.get('max_severity'),
+        ))
+
+    with transaction.atomic():
+        DailyRollup.objects.filter(date__in=dates).exclude(
+            date__in=[rollup.date for rollup in rollups]
+        ).delete()
+        DailyRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=['entries', 'meals', 'estimated_calories', 'symptom_count', 'max_severity'],
+        )
+
+
+def rebuild_rollups(batch_days=365):
+    """Rebuild every rollup from scratch, a year of days at a time"""
+    days = list(FoodLog.objects.order_by('date').values_list('date', flat=True).distinct())
+    DailyRollup.objects.exclude(date__in=FoodLog.objects.values('date')).delete()
+    for start in range(0, len(days), batch_days):
+        refresh_rollups(days[start:start + batch_days])
+    return len(days)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import FoodLog, SymptomLog
+from .models import DailyRollup, FoodLog, SymptomLog
 
 class FoodLogSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,4 +10,19 @@ class FoodLogSerializer(serializers.ModelSerializer):
 class SymptomLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = SymptomLog
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class FoodLogWithSymptomsSerializer(serializers.ModelSerializer):
+    symptoms = SymptomLogSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = FoodLog
+        fields = '__all__'
+
+
+
+class DailyRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyRollup
+        exclude = ['id']
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .list_cache import invalidate_food_logs, invalidate_symptoms
+from .models import FoodLog, SymptomLog
+from .rollups import schedule_refresh
+
+
+@receiver(pre_save, sender=FoodLog)
+def remember_food_log_date(sender, instance, **kwargs):
+    # An edit can move a log to another day; both days' slices go stale
+    instance._previous_date = None
+    if instance.pk is not None:
+        instance._previous_date = (
+            FoodLog.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=FoodLog)
+@receiver(post_delete, sender=FoodLog)
+def food_log_changed(sender, instance, **kwargs):
+    dates = [instance.date, getattr(instance, '_previous_date', None)]
+    invalidate_food_logs(dates)
+    schedule_refresh(dates=dates)
+
+
+@receiver(pre_save, sender=SymptomLog)
+def remember_symptom_food_log(sender, instance, **kwargs):
+    instance._previous_food_log_id = None
+    if instance.pk is not None:
+        instance._previous_food_log_id = (
+            SymptomLog.objects.filter(pk=instance.pk).values_list('food_log_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=SymptomLog)
+@receiver(post_delete, sender=SymptomLog)
+def symptom_log_changed(sender, instance, **kwargs):
+    invalidate_symptoms()
+    schedule_refresh(food_log_ids=[
+        instance.food_log_id, getattr(instance, '_previous_food_log_id', None)
+    ])
@@ -1,3 +1,1055 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import importlib
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import chatbot_workers
+from .answer_cache import AnswerCache, normalize_question
+from .calories import quantity_multiplier
+from .chunk_dedup import ChunkDeduplicator
+from .embedding_backends import load_embeddings
+from .embedding_cache import CachedEmbeddings
+from .food_index import reset_food_index
+from .gemini_client import GeminiClient, TokenBucket
+from .ingestion import Manifest, PineconeIndexWriter, chunk_id, file_digest, ingest
+from .local_vector_store import LocalVectorIndex, LocalVectorStore
+from .models import DailyRollup, FoodCalorie, FoodLog, SymptomLog
+from .query_batcher import MicroBatchingEmbeddings
+from .retrieval_cache import CachedRetriever, RetrievalCache, bump_index_version
+
+
+class HealthappTestCase(APITestCase):
+    def setUp(self):
+        # List responses are cached across requests; start every test cold
+        cache.clear()
+
+
+class DashboardSummaryTests(HealthappTestCase):
+    def test_summary_counts_month_days_streak_and_symptoms(self):
+        today = timezone.localdate()
+        for offset in (0, 0, 1, 2, 4):
+            FoodLog.objects.create(food='Rice', quantity='1 bowl', meal='Lunch',
+                                   date=today - timedelta(days=offset))
+        log = FoodLog.objects.first()
+        SymptomLog.objects.create(food_log=log, symptom='Bloating', severity=3)
+
+        response = self.client.get(reverse('dashboard-summary'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['streak'], 3)
+        self.assertEqual(response.data['symptom_count'], 1)
+        expected_days = len({today - timedelta(days=o) for o in (0, 1, 2, 4)
+                             if (today - timedelta(days=o)).month == today.month})
+        self.assertEqual(response.data['days_logged_this_month'], expected_days)
+
+    def test_streak_can_end_yesterday(self):
+        today = timezone.localdate()
+        for offset in (1, 2):
+            FoodLog.objects.create(food='Dal', quantity='1 cup', meal='Dinner',
+                                   date=today - timedelta(days=offset))
+
+        response = self.client.get(reverse('dashboard-summary'))
+
+        self.assertEqual(response.data['streak'], 2)
+
+
+class FoodLogPaginationTests(HealthappTestCase):
+    def test_cursor_walks_every_row_once_in_order(self):
+        today = timezone.localdate()
+        for i in range(7):
+            FoodLog.objects.create(food=f'Food {i}', quantity='1', meal='Lunch',
+                                   date=today - timedelta(days=i % 3))
+        expected = list(FoodLog.objects.order_by('-date', '-created_at', '-id')
+                        .values_list('id', flat=True))
+
+        seen = []
+        url = reverse('foodlog-list-create') + '?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_prior_page(self):
+        for i in range(4):
+            FoodLog.objects.create(food=f'Food {i}', quantity='1', meal='Lunch')
+        first = self.client.get(reverse('foodlog-list-create') + '?page_size=2')
+        second = self.client.get(first.data['next'])
+
+        back = self.client.get(second.data['previous'])
+
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('symptom-list-create') + '?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkWriteTests(HealthappTestCase):
+    def test_bulk_create_rejects_whole_batch_with_per_item_errors(self):
+        payload = [
+            {'food': 'Oats', 'quantity': '1 bowl', 'meal': 'Breakfast'},
+            {'food': 'Rice', 'quantity': '1 bowl'},
+        ]
+
+        response = self.client.post(reverse('foodlog-bulk'), payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0], {})
+        self.assertIn('meal', response.data['errors'][1])
+        self.assertFalse(FoodLog.objects.exists())
+
+    def test_bulk_create_update_delete(self):
+        payload = [{'food': f'Food {i}', 'quantity': '1', 'meal': 'Lunch', 'date': '2025-06-20'}
+                   for i in range(3)]
+        created = self.client.post(reverse('foodlog-bulk'), payload, format='json')
+        self.assertEqual(created.status_code, 201)
+        ids = [row['id'] for row in created.data]
+
+        updated = self.client.patch(reverse('foodlog-bulk'),
+                                    [{'id': pk, 'meal': 'Dinner'} for pk in ids], format='json')
+        self.assertEqual(updated.status_code, 200)
+        self.assertEqual(FoodLog.objects.filter(meal='Dinner').count(), 3)
+
+        missing = self.client.patch(reverse('foodlog-bulk'), [{'id': 0, 'meal': 'Snack'}], format='json')
+        self.assertEqual(missing.data['errors'], [{'id': ['Not found.']}])
+
+        deleted = self.client.delete(reverse('foodlog-bulk'), {'ids': ids[:2]}, format='json')
+        self.assertEqual(deleted.data, {'deleted': 2})
+        self.assertEqual(FoodLog.objects.count(), 1)
+
+        invalid = self.client.delete(reverse('foodlog-bulk'), {'ids': ['abc']}, format='json')
+        self.assertEqual(invalid.status_code, 400)
+
+
+class FoodLogWithSymptomsTests(HealthappTestCase):
+    def _seed(self, count):
+        for i in range(count):
+            log = FoodLog.objects.create(food=f'Food {i}', quantity='1', meal='Lunch',
+                                         date=timezone.localdate())
+            SymptomLog.objects.create(food_log=log, symptom='Bloating', severity=2)
+            SymptomLog.objects.create(food_log=log, symptom='Nausea', severity=4)
+
+    def test_nests_symptoms(self):
+        self._seed(1)
+
+        response = self.client.get(reverse('foodlog-with-symptoms'))
+
+        row = response.data['results'][0]
+        self.assertEqual({s['symptom'] for s in row['symptoms']}, {'Bloating', 'Nausea'})
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self._seed(3)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('foodlog-with-symptoms'))
+
+        self._seed(20)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('foodlog-with-symptoms'))
+        self.assertEqual(len(response.data['results']), 23)
+
+
+@override_settings(HEALTHAPP_LIST_CACHE_LOCAL=True)
+class ListCacheTests(HealthappTestCase):
+    def _create(self, day):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('foodlog-list-create'),
+                                        {'food': 'Rice', 'quantity': '1', 'meal': 'Lunch', 'date': day})
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_unchanged_list_returns_304(self):
+        self._create('2025-06-20')
+        first = self.client.get(reverse('foodlog-list-create'))
+
+        again = self.client.get(reverse('foodlog-list-create'), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(again.status_code, 304)
+        self.assertFalse(again.content)
+
+    def test_write_only_invalidates_affected_date_slice(self):
+        url = reverse('foodlog-list-create') + '?date=2025-06-20'
+        self._create('2025-06-20')
+        before = self.client.get(url)
+
+        self._create('2025-06-21')
+        self.assertEqual(self.client.get(url)['ETag'], before['ETag'])
+
+        self._create('2025-06-20')
+        after = self.client.get(url)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.assertEqual(len(after.data['results']), 2)
+
+    def test_moving_a_log_invalidates_its_old_date(self):
+        url = reverse('foodlog-list-create') + '?date=2025-06-20'
+        pk = self._create('2025-06-20')
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('foodlog-detail', args=[pk]), {'date': '2025-06-22'})
+
+        self.assertEqual(len(self.client.get(url).data['results']), 0)
+
+    def test_non_canonical_date_slice_is_invalidated(self):
+        url = reverse('foodlog-list-create') + '?date=2025-6-20'
+        self._create('2025-06-20')
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+
+        self._create('2025-06-20')
+        self.assertEqual(len(self.client.get(url).data['results']), 2)
+
+    @override_settings(HEALTHAPP_LIST_CACHE_LOCAL=False)
+    def test_process_local_backend_does_not_cache(self):
+        self._create('2025-06-20')
+        response = self.client.get(reverse('foodlog-list-create'))
+        self.assertNotIn('ETag', response)
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class ConditionalDetailTests(HealthappTestCase):
+    def setUp(self):
+        super().setUp()
+        self.log = FoodLog.objects.create(food='Rice', quantity='1', meal='Lunch', date='2025-06-20')
+        self.url = reverse('foodlog-detail', args=[self.log.pk])
+
+    def test_repeat_read_returns_304(self):
+        first = self.client.get(self.url)
+        self.assertIn('Last-Modified', first)
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304
+        )
+
+    def test_stale_if_match_is_rejected(self):
+        etag = self.client.get(self.url)['ETag']
+        payload = {'food': 'Dal', 'quantity': '1', 'meal': 'Lunch', 'date': '2025-06-20'}
+
+        accepted = self.client.put(self.url, payload, HTTP_IF_MATCH=etag)
+        self.assertEqual(accepted.status_code, 200)
+        self.assertNotEqual(accepted['ETag'], etag)
+
+        rejected = self.client.put(self.url, dict(payload, food='Roti'), HTTP_IF_MATCH=etag)
+        self.assertEqual(rejected.status_code, 412)
+        self.log.refresh_from_db()
+        self.assertEqual(self.log.food, 'Dal')
+
+    def test_bulk_update_bumps_updated_at(self):
+        before = self.log.updated_at
+        self.client.patch(reverse('foodlog-bulk'), [{'id': self.log.pk, 'meal': 'Dinner'}], format='json')
+        self.log.refresh_from_db()
+        self.assertGreater(self.log.updated_at, before)
+
+
+class DailyCaloriesTests(HealthappTestCase):
+    def setUp(self):
+        super().setUp()
+        call_command('load_food_calories', stdout=StringIO())
+        self.addCleanup(reset_food_index)
+
+    def test_loads_csv_once_per_normalized_name(self):
+        self.assertEqual(FoodCalorie.objects.filter(normalized_name='dal').count(), 1)
+
+    def test_totals_exact_and_substring_matches_with_quantity(self):
+        roti = FoodCalorie.objects.get(normalized_name='roti').calories
+        FoodLog.objects.create(food='  ROTI ', quantity='2 pieces', meal='Lunch', date='2025-06-20')
+        FoodLog.objects.create(food='Masala roti', quantity='1', meal='Dinner', date='2025-06-20')
+        FoodLog.objects.create(food='Moon cheese', quantity='1', meal='Snack', date='2025-06-20')
+        FoodLog.objects.create(food='Roti', quantity='1', meal='Lunch', date='2025-06-21')
+
+        response = self.client.get(reverse('calories-daily'), {'date': '2025-06-20'})
+
+        self.assertEqual(response.status_code, 200)
+        by_food = {entry['food']: entry['calories'] for entry in response.data['entries']}
+        self.assertEqual(by_food['  ROTI '], roti * 5 * 2)
+        self.assertEqual(by_food['Moon cheese'], 0)
+        self.assertGreater(by_food['Masala roti'], 0)
+        self.assertEqual(response.data['total_calories'], sum(by_food.values()))
+
+    def test_quantity_multiplier_reads_fractions(self):
+        self.assertEqual(quantity_multiplier('1/2 bowl'), 0.5)
+        self.assertEqual(quantity_multiplier('3/4 cup'), 0.75)
+        self.assertEqual(quantity_multiplier('0.25 plate'), 0.25)
+        self.assertEqual(quantity_multiplier('two rotis'), 2)
+
+    def test_quantity_multiplier_reads_the_leading_number(self):
+        cases = {
+            '1.5 cups': 1.5,
+            '0.75 cup': 0.75,
+            '2 1/2 rotis': 2.5,
+            '12 almonds': 12,
+            '10.5 g': 1,
+            '250ml': 1,
+            'half plate': 0.5,
+            'a bowl': 1,
+        }
+        for quantity, multiplier in cases.items():
+            with self.subTest(quantity=quantity):
+                self.assertEqual(quantity_multiplier(quantity), multiplier)
+
+    def test_rejects_bad_date(self):
+        response = self.client.get(reverse('calories-daily'), {'date': '20-06-2025'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_food_search_uses_aliases_and_fuzzy_matches(self):
+        def top(query):
+            response = self.client.get(reverse('food-search'), {'q': query})
+            return response.data[0]['name']
+
+        self.assertEqual(top('chapati'), 'Roti')
+        self.assertEqual(top('dal tadka'), 'Dal')
+        self.assertEqual(top('brocoli'), 'Broccoli 1 cup')
+
+    def test_alias_resolves_calories(self):
+        FoodLog.objects.create(food='Chapati', quantity='1', meal='Lunch', date='2025-06-20')
+        response = self.client.get(reverse('calories-daily'), {'date': '2025-06-20'})
+        self.assertEqual(response.data['total_calories'],
+                         FoodCalorie.objects.get(normalized_name='roti').calories * 5)
+
+
+class DailyRollupTests(HealthappTestCase):
+    def _log(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return FoodLog.objects.create(quantity='1', **fields)
+
+    def test_rollup_follows_creates_edits_and_deletes(self):
+        rice = self._log(food='Rice', meal='Lunch', date='2025-06-20')
+        self._log(food='Dal', meal='Dinner', date='2025-06-20')
+        with self.captureOnCommitCallbacks(execute=True):
+            SymptomLog.objects.create(food_log=rice, symptom='Bloating', severity=6)
+
+        rollup = DailyRollup.objects.get(date='2025-06-20')
+        self.assertEqual((rollup.entries, rollup.meals), (2, 2))
+        self.assertEqual((rollup.symptom_count, rollup.max_severity), (1, 6))
+
+        rice.refresh_from_db()
+        rice.date = timezone.datetime(2025, 6, 21).date()
+        with self.captureOnCommitCallbacks(execute=True):
+            rice.save()
+        self.assertEqual(DailyRollup.objects.get(date='2025-06-20').symptom_count, 0)
+        self.assertEqual(DailyRollup.objects.get(date='2025-06-21').max_severity, 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rice.delete()
+        self.assertFalse(DailyRollup.objects.filter(date='2025-06-21').exists())
+
+    def test_rebuild_matches_incremental(self):
+        self._log(food='Rice', meal='Lunch', date='2025-06-20')
+        expected = list(DailyRollup.objects.values())
+        DailyRollup.objects.all().delete()
+
+        call_command('rebuild_daily_rollups', stdout=StringIO())
+
+        self.assertEqual(
+            [dict(row, id=None) for row in DailyRollup.objects.values()],
+            [dict(row, id=None) for row in expected],
+        )
+
+    def test_migration_backfills_days_logged_before_rollups(self):
+        from django.apps import apps
+        backfill = importlib.import_module('healthapp.migrations.0009_backfill_daily_rollups')
+
+        self._log(food='Rice', meal='Lunch', date='2025-06-20')
+        expected = list(DailyRollup.objects.values('date', 'entries', 'meals', 'symptom_count'))
+        DailyRollup.objects.all().delete()
+
+        backfill.backfill_daily_rollups(apps, None)
+        self.assertEqual(list(DailyRollup.objects.values('date', 'entries', 'meals', 'symptom_count')), expected)
+
+    def test_range_endpoint(self):
+        self._log(food='Rice', meal='Lunch', date='2025-06-20')
+        self._log(food='Rice', meal='Lunch', date='2025-07-20')
+
+        response = self.client.get(reverse('rollups-daily'), {'start': '2025-06-01', 'end': '2025-06-30'})
+
+        self.assertEqual([row['date'] for row in response.data], ['2025-06-20'])
+
+
+class AnswerCacheTests(SimpleTestCase):
+    VECTORS = {
+        'what is diabetes': [1.0, 0.0, 0.0],
+        'what s diabetes': [0.99, 0.1, 0.0],
+        'what is asthma': [0.0, 1.0, 0.0],
+    }
+
+    def _embed(self, question):
+        return self.VECTORS[normalize_question(question)]
+
+    def test_exact_and_semantic_hits(self):
+        cache = AnswerCache(embed=self._embed, threshold=0.95)
+        self.assertEqual(cache.get('What is diabetes?')[0], None)
+        cache.put('What is diabetes?', 'A chronic disease.')
+
+        self.assertEqual(cache.get('what is DIABETES')[0], 'A chronic disease.')
+        self.assertEqual(cache.get("What's diabetes?")[0], 'A chronic disease.')
+        self.assertIsNone(cache.get('What is asthma?')[0])
+        self.assertEqual(cache.stats()['exact_hits'], 1)
+        self.assertEqual(cache.stats()['semantic_hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_lru_and_ttl(self):
+        cache = AnswerCache(max_size=1)
+        cache.put('first', 'a')
+        cache.put('second', 'b')
+        self.assertIsNone(cache.get('first')[0])
+
+        expired = AnswerCache(ttl=0)
+        expired.put('first', 'a')
+        self.assertIsNone(expired.get('first')[0])
+
+
+class ChatbotStreamTests(SimpleTestCase):
+    async def test_streams_tokens_then_done(self):
+        async def astream_medical_answer(question):
+            for piece in ('Diabetes ', 'is chronic.'):
+                yield piece
+
+        fake = types.SimpleNamespace(astream_medical_answer=astream_medical_answer)
+        with mock.patch.dict(sys.modules, {'healthapp.medical_chatbot_api': fake}):
+            response = await self.async_client.get(reverse('chatbot-stream'), {'question': 'diabetes?'})
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('event: token\ndata: {"token": "Diabetes "}', body)
+        self.assertIn('"answer": "Diabetes is chronic."', body)
+
+    async def test_requires_question(self):
+        response = await self.async_client.post(reverse('chatbot-stream'), {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ChatbotAsyncQueryTests(SimpleTestCase):
+    async def _post(self, aask):
+        fake = types.SimpleNamespace(aask_medical_question=aask)
+        with mock.patch.dict(sys.modules, {'healthapp.medical_chatbot_api': fake}):
+            return await self.async_client.post(reverse('chatbot-query-async'), {'question': 'diabetes?'},
+                                                content_type='application/json')
+
+    async def test_returns_answer(self):
+        async def aask(question):
+            return f'About {question}'
+
+        response = await self._post(aask)
+
+        self.assertEqual(response.json()['answer'], 'About diabetes?')
+
+    async def test_timeout_is_504(self):
+        async def aask(question):
+            raise asyncio.TimeoutError
+
+        response = await self._post(aask)
+
+        self.assertEqual(response.status_code, 504)
+
+
+class ChatbotInflightTests(SimpleTestCase):
+    class SlowChain:
+        async def astream(self, payload):
+            yield {'answer': 'Diabetes '}
+            await asyncio.sleep(10)
+            yield {'answer': 'is chronic.'}
+
+    def test_stream_deadline_releases_the_slot_of_each_event_loop(self):
+        from . import medical_chatbot_api
+
+        async def collect():
+            pieces = []
+            with self.assertRaises(asyncio.TimeoutError):
+                async for piece in medical_chatbot_api.astream_medical_answer('diabetes?'):
+                    pieces.append(piece)
+            slots = medical_chatbot_api._inflight_slots()
+            return pieces, slots, slots._value
+
+        with mock.patch.object(medical_chatbot_api, 'initialize_chatbot', return_value=self.SlowChain()), \
+                mock.patch.object(medical_chatbot_api._answer_cache, 'get', return_value=(None, None)), \
+                mock.patch.object(medical_chatbot_api, 'REQUEST_TIMEOUT', 0.1):
+            # Each asyncio.run() is a new loop, like async_to_sync under WSGI
+            first = asyncio.run(collect())
+            second = asyncio.run(collect())
+
+        self.assertEqual(first[0], ['Diabetes '])
+        self.assertIsNot(first[1], second[1])
+        self.assertEqual(second[2], medical_chatbot_api.MAX_INFLIGHT)
+
+
+class EmbeddingBackendTests(SimpleTestCase):
+    def test_unknown_backend_is_rejected_before_loading_anything(self):
+        with self.assertRaisesMessage(ValueError, 'onnx-int8'):
+            load_embeddings('tensorrt')
+
+
+class CachedEmbeddingsTests(SimpleTestCase):
+    class CountingEmbeddings:
+        def __init__(self):
+            self.calls = []
+
+        def embed_documents(self, texts):
+            self.calls.append(list(texts))
+            return [[float(len(text)), 1.0] for text in texts]
+
+        def embed_query(self, text):
+            self.calls.append([text])
+            return [float(len(text)), 2.0]
+
+    def test_documents_and_queries_are_embedded_once_and_persisted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'embeddings.sqlite3'
+            inner = self.CountingEmbeddings()
+            cached = CachedEmbeddings(inner, 'test-model', path=path)
+
+            self.assertEqual(cached.embed_documents(['a', 'bb', 'a']), [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]])
+            cached.embed_documents(['bb', 'ccc'])
+            self.assertEqual(cached.embed_query('a'), [1.0, 2.0])
+            cached.embed_query('a')
+            self.assertEqual(inner.calls, [['a', 'bb'], ['ccc'], ['a']])
+
+            reopened = CachedEmbeddings(self.CountingEmbeddings(), 'test-model', path=path)
+            self.assertEqual(reopened.embed_documents(['ccc']), [[3.0, 1.0]])
+            self.assertEqual(reopened.embeddings.calls, [])
+            self.assertEqual(CachedEmbeddings(inner, 'other-model', path=path).embed_query('a'), [1.0, 2.0])
+            self.assertEqual(inner.calls[-1], ['a'])
+
+
+class LocalVectorIndexTests(SimpleTestCase):
+    def test_search_upsert_and_delete(self):
+        index = LocalVectorIndex(2)
+        index.upsert(['x', 'y'], [[1.0, 0.0], [0.0, 3.0]], [{'n': 'x'}, {'n': 'y'}])
+        self.assertEqual([row[0] for row in index.search([0.9, 0.1], k=2)], ['x', 'y'])
+
+        index.upsert(['x'], [[0.0, -1.0]], [{'n': 'x2'}])
+        self.assertEqual(index.search([0.0, -2.0], k=1)[0][:2], ('x', {'n': 'x2'}))
+        self.assertEqual(len(index), 2)
+
+        index.delete(['y'])
+        self.assertEqual([row[0] for row in index.search([0.0, 1.0], k=5)], ['x'])
+
+    def test_ivf_round_trip_matches_flat_search(self):
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(8, 16))
+        vectors = np.repeat(centers, 50, axis=0) + rng.normal(scale=0.05, size=(400, 16))
+        ids = [f'doc-{i}' for i in range(400)]
+        flat = LocalVectorIndex(16)
+        flat.upsert(ids, vectors, [{} for _ in ids])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            ivf = LocalVectorIndex(16, tmp, nprobe=2)
+            ivf.upsert(ids, vectors, [{} for _ in ids])
+            ivf.build_ivf(n_lists=8)
+            ivf.save()
+
+            loaded = LocalVectorIndex.load(tmp, 16, nprobe=2)
+            self.assertIsNotNone(loaded.centroids)
+            for query in vectors[::37]:
+                self.assertEqual(loaded.search(query, k=3)[0][0], flat.search(query, k=3)[0][0])
+
+            # Later rows join the existing clusters instead of clearing them
+            loaded.upsert(['new'], [centers[3]], [{}])
+            self.assertIsNotNone(loaded.centroids)
+            self.assertEqual(loaded.search(centers[3], k=1)[0][0], 'new')
+            self.assertEqual(len(LocalVectorIndex.load(tmp, 16)), 400)
+
+
+class IngestionTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('healthapp.ingestion.bump_index_version')
+        self.bump_index_version = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    class HashEmbeddings:
+        """Pseudo-random vectors that ignore digits, so "Page 1" and "Page 2" embed alike"""
+
+        def embed_documents(self, texts):
+            return [self.embed_query(text) for text in texts]
+
+        def embed_query(self, text):
+            digest = hashlib.md5(re.sub(r'\d', '', text).encode('utf-8')).digest()
+            return [byte - 127.5 for byte in digest[:8]]
+
+    @staticmethod
+    def split_lines(path):
+        return [(line, {'page': 0}) for line in Path(path).read_text().splitlines()]
+
+    def test_only_new_changed_and_removed_files_touch_the_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = Path(tmp) / 'Data'
+            data.mkdir()
+            (data / 'a.pdf').write_text('asthma\nangina')
+            (data / 'b.pdf').write_text('burns')
+            store = LocalVectorStore(LocalVectorIndex(8), self.HashEmbeddings())
+            manifest = Manifest(Path(tmp) / 'manifest.json')
+
+            report = ingest(data, store, manifest, workers=1, load=self.split_lines)
+            self.assertEqual((report['added'], report['chunks']), (2, 3))
+            self.assertEqual(len(store.index), 3)
+
+            self.assertEqual(self.bump_index_version.call_count, 1)
+
+            report = ingest(data, store, Manifest(manifest.path), workers=1, load=self.split_lines)
+            self.assertEqual((report['unchanged'], report['chunks']), (2, 0))
+            self.assertEqual(self.bump_index_version.call_count, 1)
+
+            (data / 'a.pdf').write_text('asthma')
+            (data / 'b.pdf').unlink()
+            report = ingest(data, store, Manifest(manifest.path), workers=1, load=self.split_lines)
+            self.assertEqual((report['changed'], report['removed'], report['chunks']), (1, 1, 1))
+            self.assertEqual([row['page_content'] for row in store.index.payloads], ['asthma'])
+
+    def test_new_embedding_namespace_reingests_every_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = Path(tmp) / 'Data'
+            data.mkdir()
+            (data / 'a.pdf').write_text('asthma\nangina')
+            store = LocalVectorStore(LocalVectorIndex(8), self.HashEmbeddings())
+            manifest = Manifest(Path(tmp) / 'manifest.json')
+            ingest(data, store, manifest, workers=1, load=self.split_lines, embedding='minilm')
+
+            report = ingest(data, store, Manifest(manifest.path), workers=1, load=self.split_lines,
+                            embedding='minilm@onnx')
+            self.assertEqual((report['changed'], report['chunks']), (1, 2))
+            self.assertEqual(len(store.index), 2)
+            self.assertEqual(Manifest(manifest.path).files['a.pdf']['embedding'], 'minilm@onnx')
+
+    def test_chunk_ids_differ_for_identical_files_at_two_paths(self):
+        digest = hashlib.sha256(b'asthma').hexdigest()
+        self.assertNotEqual(chunk_id('a.pdf', digest, 0), chunk_id('copy/a.pdf', digest, 0))
+        self.assertEqual(chunk_id('a.pdf', digest, 0), chunk_id('a.pdf', digest, 0))
+
+    def test_unversioned_manifest_entries_are_replaced(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = Path(tmp) / 'Data'
+            data.mkdir()
+            (data / 'a.pdf').write_text('asthma')
+            (data / 'b.pdf').write_text('burns')
+            digest = file_digest(data / 'b.pdf')
+            store = LocalVectorStore(LocalVectorIndex(8), self.HashEmbeddings())
+            store.add_texts(['asthma', 'burns'], ids=['old-a-0', f'{digest[:16]}-0'])
+            manifest = Path(tmp) / 'manifest.json'
+            manifest.write_text(json.dumps({
+                'a.pdf': {'sha256': file_digest(data / 'a.pdf'), 'chunk_ids': ['old-a-0']},
+                'b.pdf': {'sha256': digest, 'chunks': 1, 'upserted': 1},
+            }))
+
+            report = ingest(data, store, Manifest(manifest), workers=1, load=self.split_lines)
+            self.assertEqual((report['changed'], report['chunks']), (2, 2))
+            self.assertNotIn('old-a-0', store.index.ids)
+            self.assertEqual(len(store.index), 2)
+            self.assertEqual(json.loads(manifest.read_text())['version'], 2)
+
+    def test_pinecone_writer_uses_the_index_handle(self):
+        index = mock.Mock()
+        writer = PineconeIndexWriter(index, self.HashEmbeddings())
+
+        writer.add_embeddings([('asthma', np.ones(2, dtype=np.float32))], [{'page': 1}], ['id-0'])
+        writer.delete(['id-0'])
+
+        index.upsert.assert_called_once_with(vectors=[('id-0', [1.0, 1.0], {'page': 1, 'text': 'asthma'})])
+        index.delete.assert_called_once_with(ids=['id-0'])
+
+    def test_local_index_is_saved_once_per_run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = Path(tmp) / 'Data'
+            data.mkdir()
+            (data / 'a.pdf').write_text('asthma\nangina\nanemia\nburns')
+            store = LocalVectorStore(LocalVectorIndex(8, Path(tmp) / 'index'), self.HashEmbeddings())
+
+            with mock.patch.object(LocalVectorIndex, 'save', autospec=True,
+                                   side_effect=LocalVectorIndex.save) as save:
+                ingest(data, store, Manifest(Path(tmp) / 'manifest.json'), workers=1,
+                       load=self.split_lines, batch_size=1)
+            self.assertEqual(save.call_count, 1)
+            self.assertEqual(len(LocalVectorIndex.load(Path(tmp) / 'index', 8)), 4)
+
+    def test_interrupted_run_resumes_after_the_last_stored_chunk(self):
+        class FlakyStore(LocalVectorStore):
+            fail = True
+            added = []
+
+            def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+                text_embeddings = list(text_embeddings)
+                if self.fail and text_embeddings[0][0] == 'angina':
+                    raise ConnectionError('upsert failed')
+                self.added.extend(text for text, _ in text_embeddings)
+                return super().add_embeddings(text_embeddings, metadatas, ids)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            data = Path(tmp) / 'Data'
+            data.mkdir()
+            (data / 'a.pdf').write_text('asthma\nangina\nanemia')
+            store = FlakyStore(LocalVectorIndex(8), self.HashEmbeddings())
+            manifest = Manifest(Path(tmp) / 'manifest.json')
+
+            with mock.patch('healthapp.ingestion.time.sleep'), self.assertRaises(ConnectionError):
+                ingest(data, store, manifest, workers=1, load=self.split_lines, batch_size=1)
+            self.assertEqual(Manifest(manifest.path).files['a.pdf']['upserted'], 1)
+
+            store.fail = False
+            report = ingest(data, store, Manifest(manifest.path), workers=1, load=self.split_lines, batch_size=1)
+            self.assertEqual((report['resumed'], report['chunks']), (1, 2))
+            self.assertEqual(store.added.count('asthma'), 1)
+            self.assertEqual(len(store.index), 3)
+
+    def test_identical_files_at_two_paths_keep_their_own_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = Path(tmp) / 'Data'
+            (data / 'copy').mkdir(parents=True)
+            (data / 'a.pdf').write_text('asthma')
+            (data / 'copy' / 'a.pdf').write_text('asthma')
+            store = LocalVectorStore(LocalVectorIndex(8), self.HashEmbeddings())
+            manifest = Manifest(Path(tmp) / 'manifest.json')
+
+            ingest(data, store, manifest, workers=1, load=self.split_lines)
+            self.assertEqual(len(store.index), 2)
+
+            (data / 'copy' / 'a.pdf').unlink()
+            ingest(data, store, Manifest(manifest.path), workers=1, load=self.split_lines)
+            self.assertEqual([row['metadata']['source'] for row in store.index.payloads], ['a.pdf'])
+
+    def test_resumed_file_still_skips_repeats_of_stored_chunks(self):
+        class FlakyStore(LocalVectorStore):
+            fail = True
+            added = []
+
+            def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+                text_embeddings = list(text_embeddings)
+                if self.fail and text_embeddings[0][0] == 'angina':
+                    raise ConnectionError('upsert failed')
+                self.added.extend(text for text, _ in text_embeddings)
+                return super().add_embeddings(text_embeddings, metadatas, ids)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            data = Path(tmp) / 'Data'
+            data.mkdir()
+            (data / 'a.pdf').write_text('Header\nPage 1\nasthma\nangina\nHeader\nPage 2')
+            store = FlakyStore(LocalVectorIndex(8), self.HashEmbeddings())
+            manifest = Manifest(Path(tmp) / 'manifest.json')
+
+            with mock.patch('healthapp.ingestion.time.sleep'), self.assertRaises(ConnectionError):
+                ingest(data, store, manifest, workers=1, load=self.split_lines, batch_size=1)
+
+            store.fail = False
+            report = ingest(data, store, Manifest(manifest.path), workers=1, load=self.split_lines, batch_size=1)
+            self.assertEqual((report['duplicates'], report['near_duplicates']), (1, 1))
+            self.assertEqual(store.added, ['Header', 'Page 1', 'asthma', 'angina'])
+
+    def test_repeated_and_near_identical_chunks_are_not_stored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data = Path(tmp) / 'Data'
+            data.mkdir()
+            (data / 'a.pdf').write_text('Medical Encyclopedia\nasthma\nPage 1\nmedical encyclopedia.\nPage 2')
+            store = LocalVectorStore(LocalVectorIndex(8), self.HashEmbeddings())
+
+            report = ingest(data, store, Manifest(Path(tmp) / 'manifest.json'), workers=1, load=self.split_lines)
+            self.assertEqual((report['chunks'], report['duplicates'], report['near_duplicates']), (5, 1, 1))
+            self.assertEqual(len(store.index), 3)
+
+
+class ChunkDeduplicatorTests(SimpleTestCase):
+    def test_near_duplicates_within_and_across_batches(self):
+        dedup = ChunkDeduplicator(threshold=0.95)
+        keep = dedup.keep_mask([[1.0, 0.0], [0.99, 0.05], [0.0, 1.0]])
+        self.assertEqual(keep.tolist(), [True, False, True])
+        keep = dedup.keep_mask([[0.0, 2.0], [1.0, 1.0]])
+        self.assertEqual(keep.tolist(), [False, True])
+        self.assertEqual(dedup.stats(), {'duplicates': 0, 'near_duplicates': 2})
+        self.assertTrue(ChunkDeduplicator(threshold=1).keep_mask([[1.0, 0.0], [1.0, 0.0]]).all())
+
+
+class GeminiClientTests(SimpleTestCase):
+    class QuotaError(Exception):
+        def __init__(self, code):
+            super().__init__(f'HTTP {code}')
+            self.code = code
+
+    class FakeLLM:
+        def __init__(self, failures=(), delay=0.0):
+            self.failures = list(failures)
+            self.delay = delay
+            self.sync_delay = 0.0
+            self.active = 0
+            self.peak = 0
+
+        def invoke(self, input, config=None, **kwargs):
+            if self.failures:
+                raise self.failures.pop(0)
+            if self.sync_delay:
+                time.sleep(self.sync_delay)
+            return f'answer to {input}'
+
+        async def ainvoke(self, input, config=None, **kwargs):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            try:
+                await asyncio.sleep(self.delay)
+            finally:
+                self.active -= 1
+            return self.invoke(input)
+
+    def test_rate_limit_and_server_errors_are_retried(self):
+        llm = self.FakeLLM([self.QuotaError(429), self.QuotaError(503)])
+        client = GeminiClient(llm, requests_per_minute=6000, max_retries=3, timeout=30)
+        with mock.patch('healthapp.gemini_client.time.sleep'):
+            self.assertEqual(client.invoke('q'), 'answer to q')
+        self.assertEqual((client.stats()['calls'], client.stats()['retries']), (3, 2))
+
+        client = GeminiClient(self.FakeLLM([self.QuotaError(400)]), requests_per_minute=6000)
+        with self.assertRaises(self.QuotaError):
+            client.invoke('q')
+
+    def test_in_flight_calls_are_capped_and_deadline_enforced(self):
+        llm = self.FakeLLM(delay=0.02)
+        client = GeminiClient(llm, requests_per_minute=60000, max_inflight=2, timeout=5)
+
+        async def burst():
+            return await asyncio.gather(*(client.ainvoke(i) for i in range(6)))
+
+        self.assertEqual(len(asyncio.run(burst())), 6)
+        self.assertEqual(llm.peak, 2)
+
+        slow = GeminiClient(self.FakeLLM(delay=1), requests_per_minute=60000, timeout=0.05)
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(slow.ainvoke('q'))
+        self.assertEqual(slow.stats()['timeouts'], 1)
+
+    def test_sync_call_is_bounded_and_its_slot_wakes_async_waiters(self):
+        llm = self.FakeLLM()
+        llm.sync_delay = 0.3
+        client = GeminiClient(llm, requests_per_minute=60000, max_inflight=1, timeout=0.05)
+        started = time.monotonic()
+        with self.assertRaises(asyncio.TimeoutError):
+            client.invoke('q')
+        self.assertLess(time.monotonic() - started, 0.25)
+
+        # The abandoned call holds the only slot until it returns
+        client.timeout = 5
+        self.assertEqual(asyncio.run(client.ainvoke('next')), 'answer to next')
+
+    def test_token_bucket_spaces_requests(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual([bucket.try_acquire(), bucket.try_acquire()], [0.0, 0.0])
+        self.assertGreater(bucket.try_acquire(), 0.05)
+
+
+class ChatbotImportTests(SimpleTestCase):
+    def test_status_does_not_load_the_rag_stack(self):
+        from . import medical_chatbot_api
+
+        status = medical_chatbot_api.get_chatbot_status()
+        self.assertEqual((status['initialized'], status['state']), (False, 'not_started'))
+        self.assertNotIn('langchain_google_genai', sys.modules)
+        self.assertNotIn('torch', sys.modules)
+
+
+class ChatbotWorkerTests(SimpleTestCase):
+    """The dispatch logic, with a thread pool standing in for the worker processes"""
+
+    def setUp(self):
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.pool.shutdown)
+        for patch in (
+            mock.patch.object(chatbot_workers, '_get_pool', return_value=self.pool),
+            mock.patch.object(chatbot_workers, '_slots', threading.BoundedSemaphore(2)),
+            mock.patch.object(chatbot_workers, '_answer', side_effect=self.answer),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    @staticmethod
+    def answer(question):
+        if question == 'slow':
+            time.sleep(0.2)
+        return f'About {question}'
+
+    def test_answers_and_frees_the_slot(self):
+        self.assertEqual(chatbot_workers.ask('asthma'), 'About asthma')
+        self.assertEqual(chatbot_workers.stats()['pending'], 0)
+
+    def test_full_queue_is_busy_and_timeouts_keep_the_slot_until_done(self):
+        with self.assertRaises(TimeoutError):
+            chatbot_workers.ask('slow', timeout=0.01)
+        chatbot_workers._slots.acquire()
+        with self.assertRaises(chatbot_workers.ChatbotBusy):
+            chatbot_workers.ask('asthma')
+        time.sleep(0.3)
+        chatbot_workers._slots.release()
+        self.assertEqual(chatbot_workers.ask('asthma'), 'About asthma')
+
+    def test_timed_out_question_still_queued_is_cancelled(self):
+        running = self.pool.submit(time.sleep, 0.2)
+        with self.assertRaises(TimeoutError):
+            chatbot_workers.ask('asthma', timeout=0.01)
+        self.assertEqual(chatbot_workers.stats()['pending'], 0)
+        running.result()
+
+    def test_broken_pool_is_replaced_on_submit(self):
+        broken = mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool('a worker died')
+        with mock.patch.object(chatbot_workers, '_get_pool', side_effect=[self.pool, broken, self.pool]), \
+                mock.patch.object(chatbot_workers, '_reset_pool') as reset:
+            self.assertEqual(chatbot_workers.ask('asthma'), 'About asthma')
+            # A worker dies while nobody is waiting on it
+            self.assertEqual(chatbot_workers.ask('angina'), 'About angina')
+        reset.assert_called_once_with()
+        self.assertEqual(chatbot_workers.stats()['pending'], 0)
+
+    def test_warm_up_reports_the_pool_state_in_the_status(self):
+        from . import medical_chatbot_api
+
+        report = {'state': 'ready', 'init_seconds': 2.5, 'error': None}
+        with mock.patch.object(chatbot_workers, 'CHATBOT_WORKERS', 2), \
+                mock.patch.object(chatbot_workers, '_worker_readiness', return_value=report), \
+                mock.patch.object(medical_chatbot_api, '_state', 'not_started'), \
+                mock.patch.object(medical_chatbot_api, '_init_seconds', None), \
+                mock.patch.object(medical_chatbot_api, '_init_error', None):
+            chatbot_workers.warm_up()
+            self.pool.submit(int).result()  # after both warm-up tasks
+            status = medical_chatbot_api.get_chatbot_status()
+            self.assertEqual((status['state'], status['init_seconds']), ('ready', 2.5))
+
+    def test_workers_skip_batching_and_split_the_gemini_quota(self):
+        from . import medical_chatbot_api
+
+        with mock.patch.object(medical_chatbot_api, '_query_batch_size', 32), \
+                mock.patch.object(medical_chatbot_api, '_gemini_processes', 1), \
+                mock.patch.object(chatbot_workers, 'CHATBOT_WORKERS', 4), \
+                mock.patch.object(medical_chatbot_api, 'initialize_chatbot') as initialize:
+            chatbot_workers._init_worker()
+            self.assertEqual(medical_chatbot_api._query_batch_size, 1)
+            self.assertEqual(medical_chatbot_api._gemini_processes, 4)
+        initialize.assert_called_once_with()
+
+    def test_view_returns_503_when_busy(self):
+        with mock.patch.object(chatbot_workers, 'enabled', return_value=True), \
+                mock.patch.object(chatbot_workers, 'ask', side_effect=chatbot_workers.ChatbotBusy):
+            response = self.client.post(reverse('chatbot-query'), {'question': 'asthma'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+
+
+class MicroBatchingEmbeddingsTests(SimpleTestCase):
+    class RecordingEmbeddings:
+        def __init__(self):
+            self.batches = []
+
+        def embed_documents(self, texts):
+            self.batches.append(list(texts))
+            if 'boom' in texts:
+                raise RuntimeError('encoder failed')
+            return [[float(len(text))] for text in texts]
+
+    def test_concurrent_queries_share_one_encode_call(self):
+        inner = self.RecordingEmbeddings()
+        batcher = MicroBatchingEmbeddings(inner, max_batch_size=8, max_wait=0.2)
+        questions = ['a', 'bb', 'ccc', 'dddd']
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            vectors = list(pool.map(batcher.embed_query, questions))
+
+        self.assertEqual(vectors, [[1.0], [2.0], [3.0], [4.0]])
+        self.assertEqual(len(inner.batches), 1)
+        self.assertEqual(batcher.stats()['batch_sizes'], {4: 1})
+
+        with self.assertRaises(RuntimeError):
+            batcher.embed_query('boom')
+        self.assertEqual(batcher.embed_query('ok'), [2.0])
+
+
+class RetrievalCacheTests(SimpleTestCase):
+    class CountingStore:
+        def __init__(self):
+            self.searches = 0
+
+        def similarity_search_by_vector(self, vector, k=4):
+            self.searches += 1
+            return [f'passage {self.searches}'][:k]
+
+    class FixedEmbeddings:
+        def embed_query(self, text):
+            return [float(len(text)), 1.0]
+
+    def test_repeated_questions_skip_the_store_until_the_index_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            version_path = Path(tmp) / 'index_version'
+            store = self.CountingStore()
+            retriever = CachedRetriever(
+                store, self.FixedEmbeddings(), k=3, cache=RetrievalCache(max_size=8, version_path=version_path)
+            )
+
+            self.assertEqual(retriever.invoke('What is asthma?'), ['passage 1'])
+            self.assertEqual(retriever.invoke('What is asthma?'), ['passage 1'])
+            self.assertEqual(store.searches, 1)
+
+            bump_index_version(version_path)
+            with mock.patch('healthapp.retrieval_cache.VERSION_CHECK_SECONDS', 0):
+                self.assertEqual(retriever.invoke('What is asthma?'), ['passage 2'])
+            self.assertEqual(retriever.cache.stats()['hits'], 1)
+            self.assertEqual(retriever.cache.stats()['version'], version_path.read_text())
+
+    @mock.patch('healthapp.local_vector_store.Document', types.SimpleNamespace)
+    def test_local_store_serves_a_new_ingest_after_the_version_bump(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data, index_path = Path(tmp) / 'Data', Path(tmp) / 'index'
+            data.mkdir()
+            version_path = Path(tmp) / 'index_version'
+            embeddings = IngestionTests.HashEmbeddings()
+
+            def run_ingest():
+                writer = LocalVectorStore(LocalVectorIndex.load(index_path, 8), embeddings)
+                with mock.patch('healthapp.ingestion.bump_index_version',
+                                lambda: bump_index_version(version_path)):
+                    ingest(data, writer, Manifest(Path(tmp) / 'manifest.json'), workers=1,
+                           load=IngestionTests.split_lines)
+
+            (data / 'a.pdf').write_text('asthma')
+            run_ingest()
+            served = LocalVectorStore(LocalVectorIndex.load(index_path, 8), embeddings)
+            retriever = CachedRetriever(served, embeddings, k=1,
+                                        cache=RetrievalCache(max_size=8, version_path=version_path))
+            self.assertEqual(retriever.invoke('burns')[0].page_content, 'asthma')
+
+            (data / 'b.pdf').write_text('burns')
+            run_ingest()
+            with mock.patch('healthapp.retrieval_cache.VERSION_CHECK_SECONDS', 0):
+                self.assertEqual(retriever.invoke('burns')[0].page_content, 'burns')
+
+    def test_retrieval_chain_input_dict_is_read(self):
+        def retrieval_chain(retriever):
+            # Like create_retrieval_chain: the retriever gets the whole input
+            return lambda inputs: {**inputs, 'context': retriever.invoke(inputs)}
+
+        embeddings = mock.Mock(wraps=self.FixedEmbeddings())
+        chain = retrieval_chain(CachedRetriever(self.CountingStore(), embeddings, cache=RetrievalCache(max_size=8)))
+        self.assertEqual(chain({'input': 'What is asthma?'})['context'], ['passage 1'])
+        embeddings.embed_query.assert_called_once_with('What is asthma?')
+
+    def test_search_started_before_a_version_bump_is_not_stored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            version_path = Path(tmp) / 'index_version'
+            cache = RetrievalCache(max_size=8, version_path=version_path)
+            with mock.patch('healthapp.retrieval_cache.VERSION_CHECK_SECONDS', 0):
+                _, version = cache.get([1.0], 3)
+                bump_index_version(version_path)
+                cache.get([2.0], 3)  # another request notices the new index
+                cache.put([1.0], 3, ['old passage'], version)
+                self.assertEqual(cache.get([1.0], 3)[0], None)
@@ -1,20 +1,38 @@
 from django.urls import path
 from .views import (
+    FoodLogBulkView,
     FoodLogListCreateView,
     FoodLogRetrieveUpdateDestroyView,
+    FoodLogWithSymptomsListView,
+    SymptomLogBulkView,
     SymptomLogListCreateView,
     SymptomLogRetrieveUpdateDestroyView,
     api_root,
+    dashboard_summary,
+    daily_calories,
+    daily_rollups,
+    food_search,
     chatbot_query,
+    chatbot_query_async,
     chatbot_status,
+    chatbot_stream,
 )
 
 urlpatterns = [
     path('', api_root, name='api-root'),
     path('foodlogs/', FoodLogListCreateView.as_view(), name='foodlog-list-create'),
+    path('foodlogs/bulk/', FoodLogBulkView.as_view(), name='foodlog-bulk'),
+    path('foodlogs/with-symptoms/', FoodLogWithSymptomsListView.as_view(), name='foodlog-with-symptoms'),
     path('foodlogs/<int:pk>/', FoodLogRetrieveUpdateDestroyView.as_view(), name='foodlog-detail'),
     path('symptoms/', SymptomLogListCreateView.as_view(), name='symptom-list-create'),
+    path('symptoms/bulk/', SymptomLogBulkView.as_view(), name='symptom-bulk'),
     path('symptoms/<int:pk>/', SymptomLogRetrieveUpdateDestroyView.as_view(), name='symptom-detail'),
+    path('dashboard/summary/', dashboard_summary, name='dashboard-summary'),
+    path('foods/search/', food_search, name='food-search'),
+    path('calories/daily/', daily_calories, name='calories-daily'),
+    path('rollups/daily/', daily_rollups, name='rollups-daily'),
     path('chatbot/', chatbot_query, name='chatbot-query'),
+    path('chatbot/async/', chatbot_query_async, name='chatbot-query-async'),
+    path('chatbot/stream/', chatbot_stream, name='chatbot-stream'),
     path('chatbot/status/', chatbot_status, name='chatbot-status'),
 ]
@@ -2,39 +2,316 @@ from rest_framework import generics
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from .models import FoodLog, SymptomLog
-from .serializers import FoodLogSerializer, SymptomLogSerializer
-from django.http import JsonResponse
-import os
+from django.db import transaction
+from django.db.models import Prefetch
+from .models import DailyRollup, FoodLog, SymptomLog
+from .serializers import (
+    DailyRollupSerializer,
+    FoodLogSerializer,
+    FoodLogWithSymptomsSerializer,
+    SymptomLogSerializer,
+)
+from .rollups import schedule_refresh
+from .pagination import FoodLogPagination, SymptomLogPagination
+from .calories import estimate_calories
+from .food_index import get_food_index
+from .conditional import ConditionalDetailMixin
+from .list_cache import (
+    FOOD_LOGS, NOT_CACHED, SYMPTOMS, CachedListMixin, invalidate_food_logs, invalidate_symptoms,
+)
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from copy import copy
+import asyncio
 import json
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-class FoodLogListCreateView(generics.ListCreateAPIView):
-    queryset = FoodLog.objects.all().order_by('-date', '-created_at')
+class FoodLogListCreateView(CachedListMixin, generics.ListCreateAPIView):
+    queryset = FoodLog.objects.all().order_by('-date', '-created_at', '-id')
     serializer_class = FoodLogSerializer
+    pagination_class = FoodLogPagination
+    cache_scope = FOOD_LOGS
+
+    def get_cache_date(self):
+        # Key on the parsed date, as invalidate_food_logs() does, so
+        # ?date=2025-6-20 and ?date=2025-06-20 share one generation
+        value = self.request.query_params.get('date', None)
+        if not value:
+            return None
+        try:
+            return parse_date(value) or NOT_CACHED
+        except ValueError:
+            return NOT_CACHED
     
     def get_queryset(self):
-        queryset = FoodLog.objects.all().order_by('-date', '-created_at')
+        queryset = FoodLog.objects.all().order_by('-date', '-created_at', '-id')
         date_filter = self.request.query_params.get('date', None)
         if date_filter:
             queryset = queryset.filter(date=date_filter)
         return queryset
 
-class FoodLogRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class FoodLogWithSymptomsListView(generics.ListAPIView):
+    serializer_class = FoodLogWithSymptomsSerializer
+    pagination_class = FoodLogPagination
+
+    def get_queryset(self):
+        # One extra query fetches the symptoms for the whole page
+        queryset = FoodLog.objects.prefetch_related(
+            Prefetch('symptoms', queryset=SymptomLog.objects.order_by('-occurred_at', '-id'))
+        ).order_by('-date', '-created_at', '-id')
+        date_filter = self.request.query_params.get('date', None)
+        if date_filter:
+            queryset = queryset.filter(date=date_filter)
+        return queryset
+
+class FoodLogRetrieveUpdateDestroyView(ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = FoodLog.objects.all()
     serializer_class = FoodLogSerializer
 
-class SymptomLogListCreateView(generics.ListCreateAPIView):
+class SymptomLogListCreateView(CachedListMixin, generics.ListCreateAPIView):
     queryset = SymptomLog.objects.all().order_by('-occurred_at', '-id')
     serializer_class = SymptomLogSerializer
+    pagination_class = SymptomLogPagination
+    cache_scope = SYMPTOMS
+
+class SymptomLogRetrieveUpdateDestroyView(ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = SymptomLog.objects.all()
+    serializer_class = SymptomLogSerializer
+
+class BulkWriteView(generics.GenericAPIView):
+    """
+    Create (POST), update (PUT/PATCH) or delete (DELETE) many rows in one
+    request and one transaction. Bodies are a list of objects (objects with
+    an `id` for updates) or `{"ids": [...]}` for deletes. If any item is
+    invalid nothing is written and `errors` holds one entry per item.
+    """
+    max_batch_size = 1000
+
+    def post(self, request, *args, **kwargs):
+        items = self._get_items(request)
+        if isinstance(items, Response):
+            return items
+
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_queryset().model
+        with transaction.atomic():
+            created = model.objects.bulk_create(
+                [model(**attrs) for attrs in serializer.validated_data]
+            )
+            self.after_bulk_write(created)
+        return Response(self.get_serializer(created, many=True).data, status=status.HTTP_201_CREATED)
+
+    def put(self, request, *args, **kwargs):
+        return self._update(request, partial=False)
+
+    def patch(self, request, *args, **kwargs):
+        return self._update(request, partial=True)
+
+    def delete(self, request, *args, **kwargs):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if (not isinstance(ids, list) or len(ids) > self.max_batch_size
+                or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids)):
+            return Response(
+                {'error': f'Expected "ids" as a list of at most {self.max_batch_size} integer ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            deleted = self.get_queryset().filter(pk__in=ids).delete()[1]
+        return Response({'deleted': deleted.get(self.get_queryset().model._meta.label, 0)})
+
+    def _update(self, request, partial):
+        items = self._get_items(request)
+        if isinstance(items, Response):
+            return items
+
+        ids = [str(item.get('id')) for item in items if isinstance(item, dict)]
+        instances = {
+            str(pk): instance
+            for pk, instance in self.get_queryset().in_bulk([pk for pk in ids if pk.isdigit()]).items()
+        }
+
+        auto_now_fields = [
+            field for field in self.get_queryset().model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        ]
+        errors, updated, previous, fields = [], [], [], set()
+        for item in items:
+            instance = instances.get(str(item.get('id'))) if isinstance(item, dict) else None
+            if instance is None:
+                errors.append({'id': ['Not found.']})
+                continue
+            serializer = self.get_serializer(instance, data=item, partial=partial)
+            if not serializer.is_valid():
+                errors.append(serializer.errors)
+                continue
+            previous.append(copy(instance))
+            for attr, value in serializer.validated_data.items():
+                setattr(instance, attr, value)
+            fields.update(serializer.validated_data)
+            # bulk_update does not run auto_now, so stamp updated_at here
+            for field in auto_now_fields:
+                field.pre_save(instance, add=False)
+                fields.add(field.name)
+            updated.append(instance)
+            errors.append({})
+
+        if any(errors):
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        if fields:
+            with transaction.atomic():
+                self.get_queryset().model.objects.bulk_update(updated, sorted(fields))
+                self.after_bulk_write(previous + updated)
+        return Response(self.get_serializer(updated, many=True).data)
 
-class SymptomLogRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+    def after_bulk_write(self, instances):
+        """
+        bulk_create/bulk_update skip model signals; subclasses whose models
+        rely on them (cache invalidation, rollups) do that bookkeeping here.
+        `instances` holds the created rows, or the rows before and after an
+        update. Deletes fire signals and do not call this.
+        """
+
+    def _get_items(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items or len(items) > self.max_batch_size:
+            return Response(
+                {'error': f'Expected a list of 1 to {self.max_batch_size} items'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return items
+
+class FoodLogBulkView(BulkWriteView):
+    queryset = FoodLog.objects.all()
+    serializer_class = FoodLogSerializer
+
+    def after_bulk_write(self, instances):
+        dates = [instance.date for instance in instances]
+        invalidate_food_logs(dates)
+        schedule_refresh(dates=dates)
+
+class SymptomLogBulkView(BulkWriteView):
     queryset = SymptomLog.objects.all()
     serializer_class = SymptomLogSerializer
 
+    def after_bulk_write(self, instances):
+        invalidate_symptoms()
+        schedule_refresh(food_log_ids=[instance.food_log_id for instance in instances])
+
+@api_view(['GET'])
+def dashboard_summary(request):
+    """
+    Aggregate dashboard stats in the database instead of shipping every log
+    """
+    today = timezone.localdate()
+
+    days_logged_this_month = (
+        FoodLog.objects
+        .filter(date__year=today.year, date__month=today.month)
+        .values('date')
+        .distinct()
+        .count()
+    )
+
+    # Walk distinct dates newest-first and stop at the first gap, so only
+    # the streak itself is read. A streak may end today or yesterday.
+    logged_days = (
+        FoodLog.objects
+        .filter(date__lte=today)
+        .order_by('-date')
+        .values_list('date', flat=True)
+        .distinct()
+    )
+    streak = 0
+    expected = today
+    for logged_day in logged_days.iterator():
+        if logged_day == expected:
+            streak += 1
+        elif streak == 0 and logged_day == today - timedelta(days=1):
+            streak = 1
+            expected = logged_day
+        else:
+            break
+        expected -= timedelta(days=1)
+
+    return Response({
+        'days_logged_this_month': days_logged_this_month,
+        'streak': streak,
+        'symptom_count': SymptomLog.objects.count(),
+    })
+
+@api_view(['GET'])
+def daily_calories(request):
+    """
+    Estimate calories for one day's food logs (?date=YYYY-MM-DD, default today)
+    """
+    date_param = request.query_params.get('date')
+    try:
+        day = parse_date(date_param) if date_param else timezone.localdate()
+    except ValueError:
+        day = None
+    if day is None:
+        return Response(
+            {'error': 'date must be formatted as YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    logs = list(
+        FoodLog.objects
+        .filter(date=day)
+        .order_by('-created_at', '-id')
+        .values('id', 'food', 'quantity', 'meal')
+    )
+    entries = [
+        dict(log, calories=calories)
+        for log, calories in zip(logs, estimate_calories(logs))
+    ]
+    return Response({
+        'date': day,
+        'total_calories': sum(entry['calories'] for entry in entries),
+        'entries': entries,
+    })
+
+@api_view(['GET'])
+def food_search(request):
+    """
+    Fuzzy food-name lookup (?q=, ?limit= up to 20) against the calorie table
+    """
+    query = request.query_params.get('q', '').strip()
+    try:
+        limit = min(max(int(request.query_params.get('limit', 5)), 1), 20)
+    except ValueError:
+        limit = 5
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    matches = get_food_index().search(query, limit=limit)
+    return Response([match._asdict() for match in matches])
+
+@api_view(['GET'])
+def daily_rollups(request):
+    """
+    Per-day totals between ?start= and ?end= (inclusive), read from DailyRollup
+    """
+    try:
+        start = parse_date(request.query_params.get('start', ''))
+        end = parse_date(request.query_params.get('end', ''))
+    except ValueError:
+        start = end = None
+    if start is None or end is None or start > end:
+        return Response(
+            {'error': 'start and end are required as YYYY-MM-DD, with start <= end'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    rollups = DailyRollup.objects.filter(date__range=(start, end)).order_by('date')
+    return Response(DailyRollupSerializer(rollups, many=True).data)
+
 @api_view(['POST'])
 def chatbot_query(request):
     """
@@ -60,8 +337,24 @@ def chatbot_query(request):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         
-        # Get the answer
-        answer = ask_medical_question(user_question)
+        # Get the answer, from the worker pool when CHATBOT_WORKERS is set
+        from . import chatbot_workers
+        if chatbot_workers.enabled():
+            try:
+                answer = chatbot_workers.ask(user_question)
+            except chatbot_workers.ChatbotBusy:
+                return Response(
+                    {'error': 'The medical assistant is busy. Please try again shortly.'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={'Retry-After': '5'}
+                )
+            except TimeoutError:
+                return Response(
+                    {'error': 'The medical assistant took too long to answer. Please try again.'},
+                    status=status.HTTP_504_GATEWAY_TIMEOUT
+                )
+        else:
+            answer = ask_medical_question(user_question)
         
         return Response({
             'answer': answer,
@@ -75,6 +368,102 @@ def chatbot_query(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+# Django 4.2's csrf_exempt/require_http_methods wrap views synchronously, so
+# the async views below check the method themselves and are marked exempt
+# directly (as the DRF views are).
+
+async def chatbot_query_async(request):
+    """
+    Async variant of chatbot_query: POST {"question": ...}.
+
+    Awaits Gemini without holding a worker thread when served through
+    backend.asgi. Concurrency is capped by CHATBOT_MAX_INFLIGHT and each
+    request by CHATBOT_TIMEOUT (504 when exceeded).
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        question = str(json.loads(request.body or b'{}').get('question', '')).strip()
+    except (ValueError, AttributeError):
+        question = ''
+    if not question:
+        return JsonResponse({'error': 'Question is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        from .medical_chatbot_api import aask_medical_question
+    except ImportError as e:
+        return JsonResponse(
+            {'error': f'Medical chatbot module not available: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    try:
+        answer = await aask_medical_question(question)
+    except asyncio.TimeoutError:
+        return JsonResponse(
+            {'error': 'The medical assistant took too long to answer. Please try again.'},
+            status=status.HTTP_504_GATEWAY_TIMEOUT
+        )
+    except Exception as e:
+        return JsonResponse(
+            {'error': f'Server error: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    return JsonResponse({
+        'answer': answer,
+        'question': question,
+        'status': 'success'
+    })
+
+chatbot_query_async.csrf_exempt = True
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+async def chatbot_stream(request):
+    """
+    Stream a chatbot answer as Server-Sent Events.
+
+    GET ?question=... (for EventSource) or POST {"question": ...}. Sends
+    `token` events with text pieces, then one `done` event carrying the full
+    answer, or an `error` event. Serve the app through backend.asgi for the
+    events to be flushed as they are produced.
+    """
+    if request.method not in ('GET', 'POST'):
+        return HttpResponseNotAllowed(['GET', 'POST'])
+    if request.method == 'POST':
+        try:
+            question = json.loads(request.body or b'{}').get('question', '')
+        except (ValueError, AttributeError):
+            question = ''
+    else:
+        question = request.GET.get('question', '')
+    question = str(question).strip()
+
+    if not question:
+        return JsonResponse({'error': 'Question is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    async def events():
+        try:
+            from .medical_chatbot_api import astream_medical_answer
+            pieces = []
+            async for piece in astream_medical_answer(question):
+                pieces.append(piece)
+                yield _sse('token', {'token': piece})
+            yield _sse('done', {'answer': ''.join(pieces), 'question': question, 'status': 'success'})
+        except asyncio.TimeoutError:
+            yield _sse('error', {'error': 'The medical assistant took too long to answer. Please try again.'})
+        except Exception as e:
+            yield _sse('error', {'error': f'Server error: {str(e)}'})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+chatbot_stream.csrf_exempt = True
+
 @api_view(['GET'])
 def chatbot_status(request):
     """
@@ -82,8 +471,7 @@ def chatbot_status(request):
     """
     try:
         from .medical_chatbot_api import get_chatbot_status
-        status = get_chatbot_status()
-        return Response(status)
+        return Response(get_chatbot_status())
     except Exception as e:
         return Response(
             {'error': f'Error getting status: {str(e)}'}, 
@@ -32,80 +32,17 @@ export default function Dashboard({ onClose }: DashboardProps) {
   };
 
   useEffect(() => {
-    axios.get("http://127.0.0.1:8000/api/foodlogs/").then(res => {
-      const today = new Date();
-      const year = today.getFullYear();
-      const month = today.getMonth(); 
-    
-      const daysThisMonth = new Set(
-        (res.data as any[])
-          .map(log => log.date)
-          .filter((dateStr: string) => {
-            const d = new Date(dateStr);
-            return d.getFullYear() === year && d.getMonth() === month;
-          })
-      );
-      const foodDaysValue = daysThisMonth.size;
-      setUniqueFoodDays(foodDaysValue);
-      animateCount(foodDaysValue, setDisplayFoodDays);
+    axios.get("http://127.0.0.1:8000/api/dashboard/summary/").then(res => {
+      const { days_logged_this_month, streak: streakCount, symptom_count } = res.data;
 
-  
-      const allLoggedDays = Array.from(new Set((res.data as any[]).map(log => log.date)))
-        .map(dateStr => {
-          const date = new Date(dateStr);
-       
-          return new Date(date.getFullYear(), date.getMonth(), date.getDate());
-        })
-        .sort((a, b) => b.getTime() - a.getTime()); 
+      setUniqueFoodDays(days_logged_this_month);
+      animateCount(days_logged_this_month, setDisplayFoodDays);
 
-      
-      let streakCount = 0;
-      const todayNormalized = new Date(today.getFullYear(), today.getMonth(), today.getDate());
-      
-     
-      const hasTodayLog = allLoggedDays.some(logDate => 
-        logDate.getTime() === todayNormalized.getTime()
-      );
-      
-      if (hasTodayLog) {
-        streakCount = 1;
-        let currentDate = new Date(todayNormalized);
-        currentDate.setDate(currentDate.getDate() - 1); 
-        
-        
-        for (let i = 0; i < allLoggedDays.length; i++) {
-          const logDate = allLoggedDays[i];
-          if (logDate.getTime() === currentDate.getTime()) {
-            streakCount++;
-            currentDate.setDate(currentDate.getDate() - 1);
-          } else if (logDate.getTime() < currentDate.getTime()) {
-          
-            break;
-          }
-        }
-      } else {
-        
-        let currentDate = new Date(todayNormalized);
-        currentDate.setDate(currentDate.getDate() - 1); 
-        
-        for (let i = 0; i < allLoggedDays.length; i++) {
-          const logDate = allLoggedDays[i];
-          if (logDate.getTime() === currentDate.getTime()) {
-            streakCount++;
-            currentDate.setDate(currentDate.getDate() - 1);
-          } else if (logDate.getTime() < currentDate.getTime()) {
-            break;
-          }
-        }
-      }
-      
       setStreak(streakCount);
       animateCount(streakCount, setDisplayStreak);
-    });
-    axios.get("http://127.0.0.1:8000/api/symptoms/").then(res => {
-      const symptomValue = (res.data as any[]).length;
-      setSymptomCount(symptomValue);
-      animateCount(symptomValue, setDisplaySymptomCount);
+
+      setSymptomCount(symptom_count);
+      animateCount(symptom_count, setDisplaySymptomCount);
     });
   }, []);
 
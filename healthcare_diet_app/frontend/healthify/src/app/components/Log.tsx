@@ -4,6 +4,7 @@ import History from "./history_log";
 import Symptoms from "./symptoms_log";
 import Recommendations from "./recommendations";
 import CalorieLookup from "./calorie_lookup";
+import { fetchAllPages } from "./fetch_all_pages";
 
 interface FoodLog {
   id: number;
@@ -30,9 +31,7 @@ export default function Log_data() {
       try {
   
         const today = new Date().toISOString().split('T')[0];
-        const foodRes = await fetch(`http://127.0.0.1:8000/api/foodlogs/?date=${today}`);
-        const foodData = await foodRes.json();
-        setFoodLogs(foodData);
+        setFoodLogs(await fetchAllPages<FoodLog>(`http://127.0.0.1:8000/api/foodlogs/?date=${today}`));
         const response = await fetch('/food_calories.csv');
         const csvText = await response.text();
         const lines = csvText.split('\n');
@@ -5,114 +5,38 @@ import { Spin } from 'antd';
 import { ToastContainer, toast } from 'react-toastify';
 import 'react-toastify/dist/ReactToastify.css';
 
-interface FoodLog {
+interface FoodLogCalories {
   id: number;
   food: string;
   quantity: string;
   meal: string;
-  date: string;
-}
-
-interface FoodCalories {
-  [key: string]: number;
+  calories: number;
 }
 
 const CaloriesTab: React.FC = () => {
-  const [todayFoodLogs, setTodayFoodLogs] = useState<FoodLog[]>([]);
-  const [foodCalories, setFoodCalories] = useState<FoodCalories>({});
+  const [todayFoodLogs, setTodayFoodLogs] = useState<FoodLogCalories[]>([]);
   const [loading, setLoading] = useState(true);
   const [totalCalories, setTotalCalories] = useState(0);
 
-  // Load food calories data
   useEffect(() => {
-    const loadCaloriesData = async () => {
-      try {
-        const response = await fetch('/food_calories.csv');
-        const csvText = await response.text();
-        const lines = csvText.split('\n');
-        const caloriesData: FoodCalories = {};
-        
-       
-        for (let i = 1; i < lines.length; i++) {
-          const line = lines[i].trim();
-          if (line) {
-            const [food, calories] = line.split(',');
-            if (food && calories) {
-              caloriesData[food.toLowerCase()] = parseInt(calories);
-            }
-          }
-        }
-        setFoodCalories(caloriesData);
-      } catch (error) {
-        console.error('Error loading calories data:', error);
-        toast.error('Error loading calories data');
-      }
-    };
-
-    loadCaloriesData();
-  }, []);
-
- 
-  useEffect(() => {
-    const fetchTodayFoodLogs = async () => {
+    const fetchTodayCalories = async () => {
       try {
         setLoading(true);
         const today = new Date().toISOString().split('T')[0];
-        const response = await axios.get(`http://127.0.0.1:8000/api/foodlogs/?date=${today}`);
-        setTodayFoodLogs(response.data);
+        const response = await axios.get(`http://127.0.0.1:8000/api/calories/daily/?date=${today}`);
+        setTodayFoodLogs(response.data.entries);
+        setTotalCalories(response.data.total_calories);
       } catch (error) {
-        console.error('Error fetching food logs:', error);
-        toast.error('Error fetching today\'s food logs');
+        console.error('Error fetching calories:', error);
+        toast.error('Error fetching today\'s calories');
       } finally {
         setLoading(false);
       }
     };
 
-    fetchTodayFoodLogs();
+    fetchTodayCalories();
   }, []);
 
- 
-  useEffect(() => {
-    let total = 0;
-    todayFoodLogs.forEach(log => {
-      const calories = getCaloriesForFood(log.food) * 5; 
-      if (calories > 0) {
-       
-        const quantity = log.quantity.toLowerCase();
-        let multiplier = 1;
-        
-        
-        if (quantity.includes('2') || quantity.includes('two')) multiplier = 2;
-        else if (quantity.includes('3') || quantity.includes('three')) multiplier = 3;
-        else if (quantity.includes('4') || quantity.includes('four')) multiplier = 4;
-        else if (quantity.includes('5') || quantity.includes('five')) multiplier = 5;
-        else if (quantity.includes('1/2') || quantity.includes('0.5')) multiplier = 0.5;
-        else if (quantity.includes('1/4') || quantity.includes('0.25')) multiplier = 0.25;
-        
-        total += calories * multiplier;
-      }
-    });
-    setTotalCalories(Math.round(total));
-  }, [todayFoodLogs, foodCalories]);
-
-  const getCaloriesForFood = (foodName: string): number => {
-    const normalizedName = foodName.toLowerCase().trim();
-    
-   
-    if (foodCalories[normalizedName]) {
-      return foodCalories[normalizedName];
-    }
-    
-   
-    for (const [food, calories] of Object.entries(foodCalories)) {
-      if (normalizedName.includes(food) || food.includes(normalizedName)) {
-        return calories;
-      }
-    }
-    
-    return 0;
-  };
-
   const formatDate = (dateString: string) => {
     const date = new Date(dateString);
     return date.toLocaleDateString('en-US', { 
@@ -174,7 +98,7 @@ const CaloriesTab: React.FC = () => {
             <div className="space-y-4">
               <h2 className="text-xl font-semibold text-gray-700 mb-4">Today's Food Log</h2>
               {todayFoodLogs.map((log) => {
-                const calories = getCaloriesForFood(log.food) * 6; 
+                const calories = log.calories;
                 return (
                   <div key={log.id} className="bg-gray-50 rounded-lg p-4 border border-gray-200">
                     <div className="flex justify-between items-start">
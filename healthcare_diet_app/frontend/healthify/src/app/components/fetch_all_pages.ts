@@ -0,0 +1,15 @@
+import axios from 'axios';
+
+// List endpoints are paginated ({ next, results }); follow the `next`
+// cursor until the last page so callers get every row.
+export async function fetchAllPages<T>(url: string): Promise<T[]> {
+  const rows: T[] = [];
+  const separator = url.includes('?') ? '&' : '?';
+  let next: string | null = `${url}${separator}page_size=500`;
+  while (next) {
+    const response: { data: { next: string | null; results: T[] } } = await axios.get(next);
+    rows.push(...response.data.results);
+    next = response.data.next;
+  }
+  return rows;
+}
@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import axios from 'axios';
+import { fetchAllPages } from './fetch_all_pages';
 import '../css/history_log.css';
 import { HistoryOutlined } from '@ant-design/icons';
 import { saveAs } from 'file-saver';
@@ -36,9 +37,9 @@ const History: React.FC = () => {
   useEffect(() => {
     const fetchFoodLogs = async () => {
       try {
-        const response = await axios.get('http://127.0.0.1:8000/api/foodlogs/');
-        setFoodLogs(response.data);
-        setFilteredLogs(response.data);
+        const logs = await fetchAllPages<FoodLog>('http://127.0.0.1:8000/api/foodlogs/');
+        setFoodLogs(logs);
+        setFilteredLogs(logs);
       } catch (err) {
         setError('Failed to fetch food history.');
       } finally {
@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react';
 import '../css/food_log.css';
 import { BulbOutlined, FireOutlined, SmileOutlined, WarningOutlined, CheckCircleOutlined } from '@ant-design/icons';
 import { Spin } from 'antd';
-import axios from 'axios';
+import { fetchAllPages } from './fetch_all_pages';
 
 interface Symptom {
   id: number;
@@ -31,8 +31,7 @@ const Recommendations: React.FC<RecommendationsProps> = ({ totalCalories, loadin
     const fetchSymptoms = async () => {
       setSymptomsLoading(true);
       try {
-        const sympRes = await axios.get('http://127.0.0.1:8000/api/symptoms/');
-        setSymptoms(sympRes.data);
+        setSymptoms(await fetchAllPages<Symptom>('http://127.0.0.1:8000/api/symptoms/'));
       } catch (err) {
       
       } finally {
@@ -1,5 +1,6 @@
 import React, { useState, useEffect, ChangeEvent, FormEvent } from 'react';
 import axios from 'axios';
+import { fetchAllPages } from './fetch_all_pages';
 import '../css/symptoms_log.css';
 import { SmileOutlined, EditOutlined, DeleteOutlined, PlusOutlined } from '@ant-design/icons';
 import { Spin } from 'antd';
@@ -54,8 +55,7 @@ const SymptomsLog: React.FC = () => {
   const fetchSymptoms = async () => {
     setLoading(true);
     try {
-      const res = await axios.get('http://127.0.0.1:8000/api/symptoms/');
-      setSymptoms(res.data);
+      setSymptoms(await fetchAllPages<Symptom>('http://127.0.0.1:8000/api/symptoms/'));
     } catch (error) {
       toast.error('Failed to fetch symptoms!');
     } finally {
@@ -65,8 +65,7 @@ const SymptomsLog: React.FC = () => {
 
   const fetchFoodLogs = async () => {
     try {
-      const res = await axios.get('http://127.0.0.1:8000/api/foodlogs/');
-      setFoodLogs(res.data);
+      setFoodLogs(await fetchAllPages<FoodLog>('http://127.0.0.1:8000/api/foodlogs/'));
     } catch (error) {
       toast.error('Failed to fetch food logs!');
     }